@@ -0,0 +1,29 @@
+{% macro event_payload_fields() %}
+    {#-
+        Event payload fields flattened into stg_events, per docs/DATA_CONTRACTS.md (1.2):
+        name, column type, and the JSON types (Snowflake TYPEOF) the contract accepts.
+        message_id / recipient_email / provider are carried by provider (SaaS) events.
+    -#}
+    {% do return([
+        {'name': 'schema_version',  'type': 'integer',       'json': ['INTEGER']},
+        {'name': 'event_id',        'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'idempotency_key', 'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'event_type',      'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'event_ts',        'type': 'timestamp_ntz', 'json': ['VARCHAR']},
+        {'name': 'received_ts',     'type': 'timestamp_ntz', 'json': ['VARCHAR']},
+        {'name': 'customer_id',     'type': 'string',        'json': ['INTEGER', 'VARCHAR']},
+        {'name': 'session_id',      'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'platform',        'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'country_code',    'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'sku',             'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'quantity',        'type': 'integer',       'json': ['INTEGER']},
+        {'name': 'revenue_cents',   'type': 'integer',       'json': ['INTEGER']},
+        {'name': 'campaign_id',     'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'url',             'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'user_agent',      'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'ip_address',      'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'message_id',      'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'recipient_email', 'type': 'string',        'json': ['VARCHAR']},
+        {'name': 'provider',        'type': 'string',        'json': ['VARCHAR']},
+    ]) %}
+{% endmacro %}
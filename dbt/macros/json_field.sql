@@ -0,0 +1,16 @@
+{#-
+    Typed field access on a JSON payload column. Snowflake reads the VARIANT path;
+    DuckDB (the local target) extracts from a JSON column and casts.
+-#}
+{% macro json_field(column, field, data_type) -%}
+    {{ return(adapter.dispatch('json_field')(column, field, data_type)) }}
+{%- endmacro %}
+
+{% macro default__json_field(column, field, data_type) -%}
+    {{ column }}:"{{ field }}"::{{ data_type }}
+{%- endmacro %}
+
+{% macro duckdb__json_field(column, field, data_type) -%}
+    {%- set duckdb_types = {'string': 'varchar', 'integer': 'bigint', 'timestamp_ntz': 'timestamp'} -%}
+    cast(json_extract_string({{ column }}, '$.{{ field }}') as {{ duckdb_types.get(data_type, data_type) }})
+{%- endmacro %}
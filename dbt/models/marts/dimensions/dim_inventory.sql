@@ -1,38 +1,13 @@
+{#-
+    Current state per (warehouse_id, sku): the open version of dim_inventory_history,
+    refreshed only for keys seen in newly ingested snapshots.
+-#}
 {{ config(
-    materialized = 'table'
+    materialized='incremental',
+    incremental_strategy='delete+insert' if target.type == 'duckdb' else 'merge',
+    unique_key='inventory_key'
 ) }}
 
-with base as (
-
-    select
-        -- stable business grain (we want 1 row per warehouse+sku)
-        warehouse_id,
-        sku,
-
-        -- descriptive / current-state attributes
-        on_hand,
-        as_of_date,
-
-        -- lineage / audit
-        ingested_at,
-        source_file
-
-    from {{ ref('stg_inventory') }}
-
-),
-
-ranked as (
-
-    select
-        *,
-        row_number() over (
-            partition by warehouse_id, sku
-            order by as_of_date desc, ingested_at desc
-        ) as rn
-    from base
-
-)
-
 select
     -- surrogate key for easy joins/tests (stable across builds)
     {{ dbt_utils.generate_surrogate_key(['warehouse_id','sku']) }} as inventory_key,
@@ -40,9 +15,18 @@ select
     warehouse_id,
     sku,
     on_hand,
-    as_of_date,
-    ingested_at,
-    source_file
 
-from ranked
-where rn = 1
\ No newline at end of file
+    -- latest snapshot date / load that reported this state
+    last_seen_date as as_of_date,
+    valid_from,
+
+    -- lineage / audit
+    last_ingested_at as ingested_at,
+    last_source_file as source_file
+
+from {{ ref('dim_inventory_history') }}
+where valid_to is null
+
+{% if is_incremental() %}
+  and last_ingested_at > (select max(ingested_at) from {{ this }})
+{% endif %}
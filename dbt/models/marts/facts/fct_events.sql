@@ -1,16 +1,61 @@
+{#-
+    Each run re-reads a bounded window of recent ingestion (events_lookback_hours),
+    dedups replays inside it and merges on idempotency_key. The merge only scans
+    target partitions from the batch's earliest event date onwards.
+
+    Upgrading: tables built before the merge key moved from event_id to
+    idempotency_key (and before event_date existed) need one
+    `dbt build --select fct_events+ --full-refresh`; on_schema_change='fail' stops
+    the incremental run with a schema mismatch instead of merging on a missing column.
+-#}
+{%- set lookback_hours = var('events_lookback_hours', 24) -%}
+{%- set ingested_since = dbt.dateadd('hour', -lookback_hours, dbt.current_timestamp()) -%}
+
+{%- set merge_predicates = [] -%}
+{%- if execute and is_incremental() and target.type == 'snowflake' -%}
+    {%- set batch_min_date = run_query(
+        "select min(cast(event_ts as date)) from " ~ ref('int_events')
+        ~ " where ingested_at >= " ~ ingested_since
+    ).columns[0].values()[0] -%}
+    {%- if batch_min_date is not none -%}
+        {%- do merge_predicates.append(
+            "DBT_INTERNAL_DEST.event_date >= '" ~ batch_min_date ~ "'"
+        ) -%}
+    {%- endif -%}
+{%- endif -%}
+
 {{ config(
     materialized='incremental',
-    unique_key='event_id'
+    incremental_strategy='delete+insert' if target.type == 'duckdb' else 'merge',
+    unique_key='idempotency_key',
+    on_schema_change='fail',
+    incremental_predicates=merge_predicates,
+    cluster_by=['event_date']
 ) }}
 
-select *
+select
+    INGESTED_AT,
+    SOURCE_FILE,
+    event_id,
+    event_ts,
+    cast(event_ts as date) as event_date,
+    -- Events without a key fall back to event_id
+    coalesce(idempotency_key, event_id) as idempotency_key,
+    event_type,
+    campaign_id,
+    message_id,
+    recipient_email,
+    provider,
+    sku
+
 from {{ ref('int_events') }}
 
 {% if is_incremental() %}
+where INGESTED_AT >= {{ ingested_since }}
+{% endif %}
 
-  where INGESTED_AT > (
-      select max(INGESTED_AT)
-      from {{ this }}
-  )
-
-{% endif %}
\ No newline at end of file
+-- Replays of the same event keep the latest ingested copy
+qualify row_number() over (
+    partition by coalesce(idempotency_key, event_id)
+    order by INGESTED_AT desc, SOURCE_FILE desc
+) = 1
@@ -1,16 +1,74 @@
-{{ config(materialized='table') }}
+{#-
+    Inventory for an event date can land after the event does, and dim_inventory_history
+    closes and opens versions as snapshots arrive. Each run therefore rebuilds every
+    event of the last events_inventory_lookback_days event dates (default 3) as well as
+    newly ingested ones, replacing all of their rows (delete+insert on event_id, since
+    the warehouse set of an event can change). Older snapshot backfills still need
+    --full-refresh.
+-#}
+{%- set lookback_days = var('events_inventory_lookback_days', 3) -%}
+
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='event_id',
+    cluster_by=['event_date']
+) }}
+
+-- Grain: one row per event per warehouse stocking the event's sku, carrying that
+-- warehouse's inventory as of the event date. Events carry no warehouse,
+-- so the warehouse comes from inventory; events without a match keep one row with
+-- null inventory columns.
+
+with events as (
+
+    -- fct_events already keeps one copy per replayed event (latest ingested)
+    select
+        event_id,
+        event_ts,
+        event_date,
+        sku,
+        event_type,
+        ingested_at
+    from {{ ref('fct_events') }}
+
+    {% if is_incremental() %}
+    where ingested_at > (select max(event_ingested_at) from {{ this }})
+        or event_date >= cast({{ dbt.dateadd('day', -lookback_days, dbt.current_timestamp()) }} as date)
+    {% endif %}
+
+),
+
+inventory as (
+
+    -- Versions only change when on_hand does, so this is far smaller than the snapshots
+    select
+        warehouse_id,
+        sku,
+        on_hand,
+        valid_from,
+        valid_to
+    from {{ ref('dim_inventory_history') }}
+
+)
 
 select
+    {{ dbt_utils.generate_surrogate_key(['e.event_id', 'i.warehouse_id']) }} as event_inventory_key,
+
     e.event_id,
     e.event_ts,
+    e.event_date,
     e.sku,
     e.event_type,
     e.ingested_at as event_ingested_at,
 
     i.on_hand,
     i.warehouse_id,
-    i.as_of_date
+    -- Date the matched on_hand level was first reported
+    i.valid_from as as_of_date
 
-from {{ ref('int_events') }} e
-left join {{ ref('int_inventory') }} i
-    on e.sku = i.sku
\ No newline at end of file
+from events e
+left join inventory i
+    on e.sku = i.sku
+    and e.event_date >= i.valid_from
+    and (i.valid_to is null or e.event_date < i.valid_to)
@@ -1,4 +1,16 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='append'
+) }}
 
 select *
-from {{ ref('stg_inventory') }}
\ No newline at end of file
+from {{ ref('stg_inventory') }}
+
+{% if is_incremental() %}
+  {% if target.type == 'duckdb' %}
+-- Local external reads stamp INGESTED_AT at query time; skip files already loaded instead
+where SOURCE_FILE not in (select distinct SOURCE_FILE from {{ this }})
+  {% else %}
+where INGESTED_AT > (select max(INGESTED_AT) from {{ this }})
+  {% endif %}
+{% endif %}
@@ -1,7 +1,38 @@
-{{ config(materialized='view') }}
+{#-
+    The payload is flattened into typed columns once, as rows arrive, so downstream
+    models read plain columns instead of re-parsing the VARIANT on every build.
+-#}
+{%- set post_hooks = [] -%}
+{%- if var('events_search_optimization', false) and target.type == 'snowflake' -%}
+    {%- do post_hooks.append(
+        "alter table {{ this }} add search optimization on equality(event_id)"
+    ) -%}
+{%- endif -%}
+
+{{ config(
+    materialized='incremental',
+    incremental_strategy='append',
+    cluster_by=['event_date'],
+    on_schema_change='append_new_columns',
+    post_hook=post_hooks
+) }}
 
 select
     INGESTED_AT,
     SOURCE_FILE,
-    PAYLOAD
-from {{ source('raw', 'email_events_raw') }}
\ No newline at end of file
+    {%- for f in event_payload_fields() %}
+    {{ json_field('PAYLOAD', f.name, f.type) }} as {{ f.name }},
+    {%- endfor %}
+    cast({{ json_field('PAYLOAD', 'event_ts', 'timestamp_ntz') }} as date) as event_date
+
+from {{ source('raw', 'email_events_raw') }}
+where PAYLOAD is not null
+
+{% if is_incremental() %}
+  {% if target.type == 'duckdb' %}
+  -- Local external reads stamp INGESTED_AT at query time; skip files already loaded instead
+  and SOURCE_FILE not in (select distinct SOURCE_FILE from {{ this }})
+  {% else %}
+  and INGESTED_AT > (select max(INGESTED_AT) from {{ this }})
+  {% endif %}
+{% endif %}
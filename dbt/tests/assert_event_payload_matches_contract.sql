@@ -0,0 +1,36 @@
+-- Schema drift: payload keys stg_events does not flatten, or values whose JSON type
+-- the contract does not accept (they would be lost or fail the cast). Checks the
+-- last day of RAW ingestion, which is what the next incremental build reads.
+-- Uses Snowflake's FLATTEN/TYPEOF, so it only runs there.
+
+{{ config(enabled=target.type == 'snowflake') }}
+
+{%- set fields = event_payload_fields() %}
+
+with recent as (
+
+    select PAYLOAD
+    from {{ source('raw', 'email_events_raw') }}
+    where PAYLOAD is not null
+      and INGESTED_AT >= {{ dbt.dateadd('day', -1, dbt.current_timestamp()) }}
+
+),
+
+payload_fields as (
+
+    select f.key as field, typeof(f.value) as json_type
+    from recent, lateral flatten(input => recent.PAYLOAD) f
+
+)
+
+select field, json_type, count(*) as occurrences
+from payload_fields
+where json_type != 'NULL_VALUE'
+  and (
+    {%- for f in fields %}
+    (field = '{{ f.name }}' and json_type not in ('{{ f.json | join("', '") }}'))
+    or
+    {%- endfor %}
+    field not in ('{{ fields | map(attribute="name") | join("', '") }}')
+  )
+group by field, json_type
@@ -0,0 +1,39 @@
+-- Every key has exactly one open version, and consecutive versions differ in their
+-- tracked attributes (otherwise the diff failed to collapse an unchanged snapshot).
+
+with versions as (
+
+    select
+        warehouse_id,
+        sku,
+        valid_from,
+        valid_to,
+        attr_hash,
+        lag(attr_hash) over (
+            partition by warehouse_id, sku
+            order by valid_from
+        ) as prev_attr_hash,
+        lag(valid_to) over (
+            partition by warehouse_id, sku
+            order by valid_from
+        ) as prev_valid_to
+    from {{ ref('dim_inventory_history') }}
+
+)
+
+select warehouse_id, sku, 'unchanged version' as problem
+from versions
+where attr_hash = prev_attr_hash
+
+union all
+
+select warehouse_id, sku, 'gap or overlap' as problem
+from versions
+where prev_attr_hash is not null and prev_valid_to <> valid_from
+
+union all
+
+select warehouse_id, sku, 'open versions <> 1' as problem
+from versions
+group by warehouse_id, sku
+having sum(case when valid_to is null then 1 else 0 end) <> 1
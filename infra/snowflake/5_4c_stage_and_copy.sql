@@ -40,6 +40,8 @@ CREATE TABLE IF NOT EXISTS RAW.INVENTORY_RAW (
   as_of_date DATE
 );
 
+-- Manual backfill over whole prefixes. Scheduled loads are incremental: the Prefect flow
+-- (load_raw in orchestration/prefect/flow.py) COPYs only the files listed in new manifests.
 COPY INTO RAW.EMAIL_EVENTS_RAW (ingested_at, source_file, payload)
 FROM (
   SELECT
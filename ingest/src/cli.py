@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from src.common.config import AppConfig
+from src.common.logging import log, log_exc
+from src.common.profiling import parse_modes, profile_run
+
+_STARTED = time.perf_counter()
+
+# source -> (entry-point module, third-party packages it imports on first use).
+# Nothing here is imported until a command needs it, so `ingest inventory` never
+# pays for psycopg or requests.
+SOURCES: dict[str, tuple[str, tuple[str, ...]]] = {
+    "postgres": ("src.extract_postgres", ("boto3", "tenacity", "psycopg")),
+    "saas": ("src.extract_saas_mailblaze", ("boto3", "tenacity", "requests")),
+    "events": ("src.ingest_events_from_file", ("boto3", "tenacity", "orjson")),
+    "inventory": ("src.ingest_inventory_csv", ("boto3", "tenacity")),
+}
+
+
+def import_report(modules: list[str]) -> list[dict[str, Any]]:
+    """
+    Import each module in order and time it. A package already pulled in by an
+    earlier entry costs ~0 here, so list entry points before their dependencies
+    to see what the entry point itself adds.
+    """
+    out = []
+    for name in modules:
+        before = len(sys.modules)
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            error = None
+        except ImportError as e:
+            error = str(e)
+        out.append(
+            {
+                "module": name,
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+                "new_modules": len(sys.modules) - before,
+                "error": error,
+            }
+        )
+    return out
+
+
+def profile_startup(sources: list[str]) -> None:
+    cli_ms = round((time.perf_counter() - _STARTED) * 1000, 1)
+    modules = [SOURCES[s][0] for s in sources]
+    modules += sorted({dep for s in sources for dep in SOURCES[s][1]})
+    report = import_report(modules)
+    log(
+        "startup_profile",
+        cli_ms=cli_ms,
+        imports=report,
+        total_import_ms=round(sum(r["ms"] for r in report), 1),
+        hint="python -X importtime -m src ... for a per-module tree",
+    )
+
+
+def run_sources(
+    cfg: AppConfig,
+    sources: list[str],
+    parallel: bool = False,
+    profile: tuple[str, ...] | None = None,
+    **kwargs: Any,
+) -> dict[str, list[str]]:
+    """
+    Run several sources in one process with one config and one S3 client (and so
+    one boto3 connection pool). A failing source does not stop the others; the
+    first failure is re-raised once all of them have finished.
+    profile (default: INGEST_PROFILE) profiles each source separately.
+    """
+    from src.common.s3 import S3Client
+
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+
+    def _one(source: str) -> list[str]:
+        module = importlib.import_module(SOURCES[source][0])
+        run_id = uuid.uuid4().hex
+        t0 = time.perf_counter()
+        manifests = profile_run(
+            cfg,
+            s3,
+            source,
+            run_id,
+            lambda: module.run(cfg, s3, run_id=run_id, **kwargs.get(source, {})),
+            profile,
+        )
+        log(
+            "ingest_source_done",
+            source=source,
+            run_id=run_id,
+            manifests=len(manifests),
+            seconds=round(time.perf_counter() - t0, 3),
+        )
+        return manifests
+
+    results: dict[str, list[str]] = {}
+    errors: dict[str, Exception] = {}
+    workers = len(sources) if parallel else 1
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {s: pool.submit(_one, s) for s in sources}
+        for source, fut in futures.items():
+            try:
+                results[source] = fut.result()
+            except Exception as e:
+                errors[source] = e
+                log_exc("ingest_source_failed", e, source=source)
+
+    log(
+        "ingest_done",
+        sources=sources,
+        parallel=parallel,
+        manifests={s: len(m) for s, m in results.items()},
+        failed=sorted(errors),
+    )
+    if errors:
+        raise next(iter(errors.values()))
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="ingest", description="Land source data in the raw zone")
+    p.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Log how long the command's imports take before running it",
+    )
+    p.add_argument(
+        "--profile",
+        metavar="MODES",
+        help="Profile the run: all, or any of cprofile,tracemalloc,sample (default: INGEST_PROFILE)",
+    )
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("postgres", help="Extract the Postgres tables (PG_EXTRACT_MODE)")
+    sub.add_parser("saas", help="Extract campaigns and email events from Mailblaze")
+    e = sub.add_parser("events", help="Ingest event files")
+    e.add_argument("--glob", dest="input_glob", help="Default: EVENTS_INPUT_GLOB")
+    i = sub.add_parser("inventory", help="Ingest inventory snapshot files")
+    i.add_argument("--dir", dest="input_dir", help="Default: INVENTORY_INPUT_DIR")
+
+    r = sub.add_parser("run", help="Run several sources in one process")
+    r.add_argument("sources", nargs="+", choices=sorted(SOURCES))
+    r.add_argument("--parallel", action="store_true", help="Run the sources concurrently")
+
+    sub.add_parser("watch", help="Watch the landing directories (see src.watch_landing)")
+    c = sub.add_parser("catalog", help="Query the manifest catalog (see src.manifest_catalog)")
+    c.add_argument("args", nargs=argparse.REMAINDER)
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.cmd == "watch":
+        from src import watch_landing
+
+        watch_landing.main()
+        return 0
+    if args.cmd == "catalog":
+        from src import manifest_catalog
+
+        sys.argv = ["ingest catalog", *args.args]
+        manifest_catalog.main()
+        return 0
+
+    sources = args.sources if args.cmd == "run" else [args.cmd]
+    if args.profile_startup:
+        profile_startup(sources)
+
+    kwargs: dict[str, dict[str, Any]] = {}
+    if args.cmd == "events" and args.input_glob:
+        kwargs["events"] = {"input_glob": args.input_glob}
+    if args.cmd == "inventory" and args.input_dir:
+        kwargs["inventory"] = {"input_dir": args.input_dir}
+
+    profile = parse_modes(args.profile) if args.profile is not None else None
+    cfg = AppConfig.load()
+    try:
+        run_sources(
+            cfg, sources, parallel=getattr(args, "parallel", False), profile=profile, **kwargs
+        )
+    except Exception:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
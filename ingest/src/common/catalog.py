@@ -0,0 +1,441 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+from .logging import log
+from .s3 import S3Client
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifests (
+    manifest_key  TEXT PRIMARY KEY,
+    etag          TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    synced_at     TEXT NOT NULL,
+    source        TEXT,
+    entity        TEXT,
+    dt            TEXT,
+    run_id        TEXT,
+    files         INTEGER NOT NULL,
+    bytes         INTEGER,
+    rows          INTEGER,
+    sha256        TEXT,
+    body          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_manifests_source_dt ON manifests (source, entity, dt);
+CREATE INDEX IF NOT EXISTS ix_manifests_run_id ON manifests (run_id);
+CREATE INDEX IF NOT EXISTS ix_manifests_last_modified ON manifests (last_modified);
+
+CREATE TABLE IF NOT EXISTS files (
+    data_key      TEXT PRIMARY KEY,
+    manifest_key  TEXT NOT NULL REFERENCES manifests (manifest_key),
+    source        TEXT,
+    entity        TEXT,
+    dt            TEXT,
+    hour          TEXT,
+    shard         TEXT,
+    run_id        TEXT,
+    bytes         INTEGER,
+    rows          INTEGER,
+    sha256        TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_files_manifest_key ON files (manifest_key);
+CREATE INDEX IF NOT EXISTS ix_files_source_dt ON files (source, entity, dt);
+CREATE INDEX IF NOT EXISTS ix_files_run_id ON files (run_id);
+
+-- Per manifest stream (.../_manifests/source=X/[table=Y/]): the largest key listed so far
+CREATE TABLE IF NOT EXISTS sync_state (
+    prefix        TEXT PRIMARY KEY,
+    last_key      TEXT NOT NULL,
+    synced_at     TEXT NOT NULL
+);
+
+-- Per sync root: when every partition under it was last listed
+CREATE TABLE IF NOT EXISTS full_syncs (
+    prefix        TEXT PRIMARY KEY,
+    synced_at     TEXT NOT NULL
+);
+
+-- Manifests (at a given ETag) a consumer such as the Prefect flow has loaded
+CREATE TABLE IF NOT EXISTS processed (
+    consumer      TEXT NOT NULL,
+    manifest_key  TEXT NOT NULL,
+    etag          TEXT NOT NULL,
+    processed_at  TEXT NOT NULL,
+    PRIMARY KEY (consumer, manifest_key)
+);
+"""
+
+
+def parse_manifest_key(key: str) -> dict[str, str | None]:
+    """
+    env=dev/raw/_manifests/source=postgres/table=orders/dt=2026-02-18/run_id=abc.json
+      -> {"source": "postgres", "entity": "orders", "dt": "2026-02-18", "run_id": "abc"}
+    """
+    out: dict[str, str | None] = {"source": None, "entity": None, "dt": None, "run_id": None}
+    rel = key.split("/_manifests/", 1)[-1]
+    for seg in rel.split("/"):
+        if seg.endswith(".json"):
+            seg = seg[: -len(".json")]
+        name, sep, value = seg.partition("=")
+        if not sep:
+            continue
+        if name in ("table", "entity"):
+            out["entity"] = value
+        elif name in out:
+            out[name] = value
+    return out
+
+
+def manifest_files(body: dict[str, Any]) -> list[dict[str, Any]]:
+    # Multi-part manifests list "parts"; single-object manifests carry "data_key"
+    if "parts" in body:
+        return list(body["parts"])
+    if "data_key" in body:
+        return [
+            {
+                "key": body["data_key"],
+                "bytes": body.get("bytes"),
+                "rows": body.get("rows"),
+                "sha256": body.get("sha256"),
+            }
+        ]
+    return []
+
+
+@dataclass
+class ManifestCatalog:
+    """
+    Local SQLite index over the ingest manifests in S3.
+
+    Manifests are immutable once written, so sync() only fetches objects whose
+    key/ETag it has not seen before; everything else is answered from the local
+    index. Listing is incremental too: see sync().
+    """
+
+    path: str
+
+    def __post_init__(self) -> None:
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _streams(self, s3: S3Client, prefix: str) -> list[str]:
+        # A stream is the deepest key=value prefix above the dt= partitions;
+        # "_"-prefixed siblings (_profiles) hold no manifests
+        children = list(s3.list_prefixes(prefix))
+        if not children or any(c[len(prefix) :].startswith("dt=") for c in children):
+            return [prefix]
+        out: list[str] = []
+        for child in children:
+            seg = child[len(prefix) :]
+            if "=" in seg and not seg.startswith("_"):
+                out += self._streams(s3, child)
+        return out
+
+    def _start_after(self, stream: str, lookback_days: int) -> str:
+        row = self.conn.execute(
+            "SELECT last_key FROM sync_state WHERE prefix = ?", (stream,)
+        ).fetchone()
+        dt = parse_manifest_key(row["last_key"])["dt"] if row else None
+        if not dt:
+            return ""
+        # "…/dt=D" sorts just before every key under "…/dt=D/", so that partition is relisted
+        since = date.fromisoformat(dt) - timedelta(days=lookback_days)
+        return f"{stream}dt={since.isoformat()}"
+
+    def _full_sync_due(self, root: str, max_age_hours: float) -> bool:
+        row = self.conn.execute(
+            "SELECT synced_at FROM full_syncs WHERE prefix = ?", (root,)
+        ).fetchone()
+        if row is None:
+            return True
+        last = datetime.strptime(row["synced_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=UTC)
+        return datetime.now(UTC) - last >= timedelta(hours=max_age_hours)
+
+    def _known_etags(self) -> dict[str, str]:
+        rows = self.conn.execute("SELECT manifest_key, etag FROM manifests")
+        return {r["manifest_key"]: r["etag"] for r in rows}
+
+    def add(self, manifest_key: str, etag: str, last_modified: str, body: dict[str, Any]) -> None:
+        meta = parse_manifest_key(manifest_key)
+        run_id = body.get("run_id") or meta["run_id"]
+        files = manifest_files(body)
+        synced_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        with self.conn:
+            self.conn.execute("DELETE FROM files WHERE manifest_key = ?", (manifest_key,))
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO manifests
+                    (manifest_key, etag, last_modified, synced_at, source, entity, dt, run_id,
+                     files, bytes, rows, sha256, body)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    manifest_key,
+                    etag,
+                    last_modified,
+                    synced_at,
+                    meta["source"],
+                    meta["entity"],
+                    meta["dt"],
+                    run_id,
+                    len(files),
+                    sum(f.get("bytes") or 0 for f in files),
+                    body.get("rows", body.get("profile", {}).get("rows")),
+                    body.get("sha256"),
+                    json.dumps(body, ensure_ascii=False),
+                ),
+            )
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO files
+                    (data_key, manifest_key, source, entity, dt, hour, shard, run_id,
+                     bytes, rows, sha256)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        f["key"],
+                        manifest_key,
+                        meta["source"],
+                        meta["entity"],
+                        f.get("dt") or meta["dt"],
+                        f.get("hour"),
+                        f.get("shard"),
+                        run_id,
+                        f.get("bytes"),
+                        f.get("rows"),
+                        f.get("sha256"),
+                    )
+                    for f in files
+                ],
+            )
+
+    def sync(
+        self,
+        s3: S3Client,
+        env: str,
+        source: str | None = None,
+        workers: int = 16,
+        full: bool | None = None,
+    ) -> int:
+        """
+        Index manifests added (or rewritten) since the last sync. Returns how many were indexed.
+
+        Each stream (source, plus table/entity where there is one) remembers the largest
+        key it listed, and the next sync lists that stream from CATALOG_SYNC_LOOKBACK_DAYS
+        (default 7) dt partitions before it via StartAfter. Run IDs are random, so the
+        partition itself is always relisted.
+
+        Manifests written into partitions older than the window (backfills, events
+        that are late by more than a week) are only found by a full listing. With
+        full=None that happens whenever the last full sync of this root is older than
+        CATALOG_FULL_SYNC_HOURS (default 24), so every caller, the scheduled flow
+        included, picks them up within that bound; full=True forces one (`sync --full`).
+        """
+        lookback_days = int(os.getenv("CATALOG_SYNC_LOOKBACK_DAYS", "7"))
+        root = f"env={env}/raw/_manifests/"
+        if source:
+            root += f"source={source}/"
+        if full is None:
+            full = self._full_sync_due(root, float(os.getenv("CATALOG_FULL_SYNC_HOURS", "24")))
+
+        known = self._known_etags()
+        new: list[dict] = []
+        last_keys: dict[str, str] = {}
+        listed = 0
+        for stream in self._streams(s3, root):
+            start_after = "" if full else self._start_after(stream, lookback_days)
+            for obj in s3.list_objects(stream, start_after=start_after):
+                if not obj["key"].endswith(".json"):
+                    continue
+                listed += 1
+                last_keys[stream] = max(last_keys.get(stream, ""), obj["key"])
+                if known.get(obj["key"]) != obj["etag"]:
+                    new.append(obj)
+
+        def _fetch(obj: dict) -> tuple[dict, dict[str, Any]]:
+            return obj, json.loads(s3.get_bytes(obj["key"]).decode("utf-8"))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for obj, body in pool.map(_fetch, new):
+                self.add(obj["key"], obj["etag"], obj["last_modified"], body)
+
+        # Only after every new manifest is indexed: a failed fetch leaves the watermark behind
+        synced_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO sync_state (prefix, last_key, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT (prefix) DO UPDATE SET
+                    last_key = max(last_key, excluded.last_key),
+                    synced_at = excluded.synced_at
+                """,
+                [(stream, key, synced_at) for stream, key in last_keys.items()],
+            )
+            if full:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO full_syncs (prefix, synced_at) VALUES (?, ?)",
+                    (root, synced_at),
+                )
+
+        log(
+            "catalog_sync",
+            prefix=root,
+            streams=len(last_keys),
+            full=full,
+            known=len(known),
+            listed=listed,
+            indexed=len(new),
+            path=self.path,
+        )
+        return len(new)
+
+    def files(
+        self,
+        source: str | None = None,
+        entity: str | None = None,
+        dt: str | None = None,
+        run_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        clauses, params = [], []
+        for col, value in (("source", source), ("entity", entity), ("dt", dt), ("run_id", run_id)):
+            if value is not None:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT * FROM files {where} ORDER BY source, entity, dt, data_key", params
+        )
+        return [dict(r) for r in rows]
+
+    def files_for_manifests(self, manifest_keys: list[str]) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(manifest_keys), 500):
+            chunk = manifest_keys[i : i + 500]
+            marks = ", ".join("?" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT * FROM files WHERE manifest_key IN ({marks}) ORDER BY data_key", chunk
+            )
+            out.extend(dict(r) for r in rows)
+        return out
+
+    def find_key(self, data_key: str) -> dict[str, Any] | None:
+        row = self.conn.execute(
+            """
+            SELECT f.*, m.last_modified AS manifest_last_modified
+            FROM files f JOIN manifests m USING (manifest_key)
+            WHERE f.data_key = ?
+            """,
+            (data_key,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def runs(
+        self, source: str | None = None, dt: str | None = None, limit: int = 100
+    ) -> list[dict[str, Any]]:
+        clauses, params = [], []
+        for col, value in (("source", source), ("dt", dt)):
+            if value is not None:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"""
+            SELECT run_id, source,
+                   group_concat(DISTINCT entity) AS entities,
+                   min(dt) AS min_dt, max(dt) AS max_dt,
+                   count(*) AS manifests, sum(files) AS files,
+                   sum(bytes) AS bytes, sum(rows) AS rows,
+                   max(last_modified) AS last_modified
+            FROM manifests {where}
+            GROUP BY run_id, source
+            ORDER BY last_modified DESC
+            LIMIT ?
+            """,
+            [*params, limit],
+        )
+        return [dict(r) for r in rows]
+
+    def manifests_since(self, last_modified: str) -> list[dict[str, Any]]:
+        """
+        Manifests with last_modified >= the given ISO8601 UTC timestamp, oldest first.
+        """
+        rows = self.conn.execute(
+            """
+            SELECT manifest_key, last_modified, source, entity, dt, run_id, files, bytes, rows
+            FROM manifests
+            WHERE last_modified >= ?
+            ORDER BY last_modified, manifest_key
+            """,
+            (last_modified,),
+        )
+        return [dict(r) for r in rows]
+
+    def unprocessed(self, consumer: str) -> list[dict[str, Any]]:
+        """
+        Manifests the consumer has not marked processed at their current ETag, oldest first.
+
+        Unlike a last_modified watermark this does not depend on the order manifests
+        become visible: one whose PUT was still in flight, or that a later full sync
+        found in an old partition, is returned whenever it turns up.
+        """
+        rows = self.conn.execute(
+            """
+            SELECT m.manifest_key, m.etag, m.last_modified, m.source, m.entity, m.dt,
+                   m.run_id, m.files, m.bytes, m.rows
+            FROM manifests m
+            LEFT JOIN processed p ON p.consumer = ? AND p.manifest_key = m.manifest_key
+            WHERE p.etag IS NULL OR p.etag != m.etag
+            ORDER BY m.last_modified, m.manifest_key
+            """,
+            (consumer,),
+        )
+        return [dict(r) for r in rows]
+
+    def mark_processed(self, consumer: str, manifests: list[dict[str, Any]]) -> None:
+        """
+        Record manifests (dicts with manifest_key and etag, as unprocessed() returns) as
+        processed. A manifest rewritten since is returned by unprocessed() again.
+        """
+        processed_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?)",
+                [(consumer, m["manifest_key"], m["etag"], processed_at) for m in manifests],
+            )
+
+    def has_processed(self, consumer: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM processed WHERE consumer = ? LIMIT 1", (consumer,)
+        ).fetchone()
+        return row is not None
+
+    def mark_processed_before(self, consumer: str, last_modified: str) -> int:
+        """
+        Mark every indexed manifest with last_modified < the given timestamp processed.
+        Seeds a rebuilt catalog from a consumer's durable watermark; returns the count.
+        """
+        processed_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self.conn:
+            cur = self.conn.execute(
+                """
+                INSERT OR IGNORE INTO processed
+                SELECT ?, manifest_key, etag, ? FROM manifests WHERE last_modified < ?
+                """,
+                (consumer, processed_at, last_modified),
+            )
+        return cur.rowcount
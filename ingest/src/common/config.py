@@ -31,6 +31,8 @@ class AppConfig:
     mailblaze_base_url: str
     mailblaze_api_key: str
 
+    state_cache_dir: str
+
     @staticmethod
     def load() -> AppConfig:
         return AppConfig(
@@ -44,4 +46,5 @@ class AppConfig:
             pg_password=_opt("PG_PASSWORD", "postgres"),
             mailblaze_base_url=_opt("MAILBLAZE_BASE_URL", "http://mock_saas:8000"),
             mailblaze_api_key=_opt("MAILBLAZE_API_KEY", "dev_key_123"),
+            state_cache_dir=_opt("STATE_CACHE_DIR", ""),
         )
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .logging import log
+from .s3 import S3Client
+
+Partition = tuple[tuple[str, str], ...]
+
+
+@dataclass(frozen=True)
+class PartFile:
+    key: str
+    partition: Partition
+    rows: int
+    bytes: int
+    sha256: str
+
+    def to_dict(self) -> dict:
+        out: dict = dict(self.partition)
+        out.update({"key": self.key, "rows": self.rows, "bytes": self.bytes, "sha256": self.sha256})
+        return out
+
+
+@dataclass
+class _Buffer:
+    data: bytearray = field(default_factory=bytearray)
+    rows: int = 0
+    parts: int = 0
+
+
+class Uploader:
+    """
+    Runs S3 puts on a thread pool so the caller can keep producing (validating)
+    while parts upload. At most max_in_flight puts are queued or running; past
+    that, submit() blocks, so a producer that outpaces the network waits instead
+    of buffering without bound.
+    """
+
+    def __init__(self, s3: S3Client, workers: int = 4, max_in_flight: int = 8) -> None:
+        self.s3 = s3
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="upload")
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+
+    def submit(self, key: str, data: bytes, content_type: str) -> Future:
+        self._slots.acquire()
+        try:
+            fut = self._pool.submit(self.s3.put_bytes, key, data, content_type)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+@dataclass
+class PartitionedWriter:
+    """
+    Routes lines into per-partition buffers and flushes them to S3 part files:
+      {prefix}/{k1}={v1}/{k2}={v2}/run_id={run_id}/part-{n:05d}{suffix}
+
+    A partition is flushed when its buffer reaches part_max_bytes; when all
+    buffers together exceed buffer_max_bytes the largest one is flushed early,
+    so memory stays bounded however many partitions a file spans.
+
+    With an uploader, flushed parts upload in the background and close() waits
+    for them; without one, every flush uploads inline.
+    """
+
+    s3: S3Client
+    prefix: str
+    run_id: str
+    suffix: str = ".jsonl"
+    content_type: str = "application/x-ndjson"
+    part_max_bytes: int = 128 * 1024 * 1024
+    buffer_max_bytes: int = 512 * 1024 * 1024
+    uploader: Uploader | None = None
+
+    _buffers: dict[Partition, _Buffer] = field(default_factory=dict, init=False)
+    _buffered: int = field(default=0, init=False)
+    _pending: list[Future] = field(default_factory=list, init=False)
+    parts: list[PartFile] = field(default_factory=list, init=False)
+
+    def write(self, partition: Partition, line: bytes) -> None:
+        buf = self._buffers.get(partition)
+        if buf is None:
+            buf = self._buffers[partition] = _Buffer()
+        buf.data += line
+        buf.rows += 1
+        self._buffered += len(line)
+
+        if len(buf.data) >= self.part_max_bytes:
+            self.flush(partition)
+        elif self._buffered > self.buffer_max_bytes:
+            largest = max(self._buffers, key=lambda p: len(self._buffers[p].data))
+            self.flush(largest)
+
+    def flush(self, partition: Partition) -> PartFile | None:
+        buf = self._buffers[partition]
+        if not buf.data:
+            return None
+
+        data = bytes(buf.data)
+        path = "/".join(f"{k}={v}" for k, v in partition)
+        key = f"{self.prefix}/{path}/run_id={self.run_id}/part-{buf.parts:05d}{self.suffix}"
+        if self.uploader is not None:
+            self._pending.append(self.uploader.submit(key, data, self.content_type))
+        else:
+            self.s3.put_bytes(key, data, self.content_type)
+
+        part = PartFile(
+            key=key,
+            partition=partition,
+            rows=buf.rows,
+            bytes=len(data),
+            sha256=hashlib.sha256(data).hexdigest(),
+        )
+        self.parts.append(part)
+
+        self._buffered -= len(data)
+        buf.data = bytearray()
+        buf.rows = 0
+        buf.parts += 1
+        return part
+
+    def close(self) -> list[PartFile]:
+        """
+        Flush every buffer and wait for all uploads. Returns the parts written.
+        """
+        for partition in list(self._buffers):
+            self.flush(partition)
+        for fut in self._pending:
+            fut.result()
+        self._pending.clear()
+        log("partitioned_write_done", prefix=self.prefix, run_id=self.run_id, parts=len(self.parts))
+        return self.parts
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from .logging import log
+from .s3 import S3Client
+
+if TYPE_CHECKING:
+    import psycopg
+
+# (key, hash): key is the primary key as JSON array text, hash is md5 of the row's JSON
+Entry = tuple[str, str]
+
+
+def primary_key(conn: psycopg.Connection, table: str) -> list[str]:
+    rows = conn.execute(
+        """
+        SELECT a.attname
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = %s::regclass AND i.indisprimary
+        ORDER BY array_position(i.indkey::int2[], a.attnum)
+        """,
+        (table,),
+    ).fetchall()
+    if not rows:
+        raise RuntimeError(f"Table {table} has no primary key; cannot diff it")
+    return [r[0] for r in rows]
+
+
+def hashed_rows(
+    conn: psycopg.Connection, table: str, pk: list[str]
+) -> Iterator[tuple[str, str, str]]:
+    """
+    Streams (key, hash, row JSON) for every row, ordered by key in byte order
+    (COLLATE "C"), which is the order Python compares the key strings in.
+    """
+    key_expr = "json_build_array(" + ", ".join(f't."{c}"' for c in pk) + ")::text"
+    with conn.cursor(name=f"diff_{table}") as cur:
+        cur.itersize = 10_000
+        cur.execute(
+            f"""
+            SELECT k, md5(doc), doc
+            FROM (SELECT {key_expr} AS k, row_to_json(t)::text AS doc FROM {table} t) s
+            ORDER BY k COLLATE "C"
+            """
+        )
+        yield from cur
+
+
+def read_snapshot(data: bytes | None) -> Iterator[Entry]:
+    if not data:
+        return
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as f:
+        for line in f:
+            key, _, h = line.decode("utf-8").rstrip("\n").partition("\t")
+            yield key, h
+
+
+def diff_rows(
+    current: Iterable[tuple[str, str, str]], previous: Iterable[Entry]
+) -> Iterator[tuple[str, str, str | None]]:
+    """
+    Merge-join two key-sorted streams. Yields (op, key, row JSON) for every
+    insert ("I"), update ("U", hash changed) and delete ("D", row is None).
+    """
+    prev = iter(previous)
+    p = next(prev, None)
+    for key, h, doc in current:
+        while p is not None and p[0] < key:
+            yield "D", p[0], None
+            p = next(prev, None)
+        if p is not None and p[0] == key:
+            if p[1] != h:
+                yield "U", key, doc
+            p = next(prev, None)
+        else:
+            yield "I", key, doc
+    while p is not None:
+        yield "D", p[0], None
+        p = next(prev, None)
+
+
+def extract_table_diff(
+    conn: psycopg.Connection,
+    s3: S3Client,
+    env: str,
+    table: str,
+    run_id: str,
+    dt: str,
+) -> str | None:
+    """
+    Ship only the rows of `table` that changed since the previous run.
+
+    Every row is hashed in SQL and merge-joined by primary key against the sorted
+    hash snapshot of the previous run (env={env}/raw/_state/row_hashes/{table}.tsv.gz).
+    Changes are written to source=postgres_diff as {"op", "key", "row"} lines; the
+    snapshot is replaced only after the change file and its manifest are written.
+    Returns the manifest key, or None when nothing changed.
+    """
+    snapshot_key = f"env={env}/raw/_state/row_hashes/{table}.tsv.gz"
+    pk = primary_key(conn, table)
+    previous = s3.get_bytes(snapshot_key) if s3.exists(snapshot_key) else None
+
+    snapshot = io.BytesIO()
+    changes = bytearray()
+    ops: Counter = Counter()
+    scanned = 0
+
+    def _current() -> Iterator[tuple[str, str, str]]:
+        nonlocal scanned
+        with gzip.GzipFile(fileobj=snapshot, mode="wb") as out:
+            for key, h, doc in hashed_rows(conn, table, pk):
+                scanned += 1
+                out.write(f"{key}\t{h}\n".encode())
+                yield key, h, doc
+
+    for op, key, doc in diff_rows(_current(), read_snapshot(previous)):
+        ops[op] += 1
+        rec = {
+            "op": op,
+            "key": dict(zip(pk, json.loads(key), strict=True)),
+            "row": json.loads(doc) if doc is not None else None,
+        }
+        changes += (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+
+    log("postgres_diff", table=table, rows=scanned, pk=pk, baseline=previous is not None, **ops)
+    if not changes:
+        return None
+
+    data_key = f"env={env}/raw/source=postgres_diff/table={table}/dt={dt}/run_id={run_id}.jsonl"
+    manifest_key = (
+        f"env={env}/raw/_manifests/source=postgres_diff/table={table}/dt={dt}/run_id={run_id}.json"
+    )
+    s3.put_idempotent(
+        data_key=data_key,
+        data=bytes(changes),
+        content_type="application/x-ndjson",
+        manifest_key=manifest_key,
+        extra={
+            "run_id": run_id,
+            "rows": sum(ops.values()),
+            "rows_scanned": scanned,
+            "ops": dict(ops),
+            "primary_key": pk,
+            "baseline": previous is not None,
+        },
+    )
+    s3.put_bytes(snapshot_key, snapshot.getvalue(), "application/gzip")
+    return manifest_key
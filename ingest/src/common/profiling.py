@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from .config import AppConfig
+from .logging import log
+from .s3 import S3Client
+
+MODES = ("cprofile", "tracemalloc", "sample")
+
+# tracemalloc is process-wide; concurrent sessions (ingest run --parallel) share one trace
+_trace_lock = threading.Lock()
+_trace_users = 0
+
+
+def parse_modes(value: str | None) -> tuple[str, ...]:
+    """
+    INGEST_PROFILE / --profile value -> profilers to run.
+    "" or "0" disables; "1" or "all" enables all; otherwise a comma-separated subset of MODES.
+    """
+    value = (value or "").strip().lower()
+    if value in ("", "0", "off", "false"):
+        return ()
+    if value in ("1", "all", "on", "true"):
+        return MODES
+    modes = tuple(m.strip() for m in value.split(",") if m.strip())
+    unknown = sorted(set(modes) - set(MODES))
+    if unknown:
+        raise ValueError(f"Unknown profile mode(s) {unknown}; expected a subset of {MODES}")
+    return modes
+
+
+class Sampler:
+    """
+    Wall-clock sampling profiler: a daemon thread records the stack of every other
+    thread each interval, including threads blocked on I/O. Stacks are kept in the
+    folded format ("outer;...;inner count") that flamegraph tools read, and peak
+    traced memory is snapshotted from the same loop when tracemalloc is on.
+    """
+
+    def __init__(self, interval: float, sample: bool, trace: bool) -> None:
+        self.interval = interval
+        self.sample = sample
+        self.trace = trace
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.peak_snapshot: tracemalloc.Snapshot | None = None
+        self.snapshot_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="ingest-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        if self.trace:
+            self._maybe_snapshot()
+
+    def _maybe_snapshot(self) -> None:
+        # Re-snapshot only when traced memory is >10% above the last snapshot:
+        # take_snapshot() walks every live allocation, so it is not free
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.snapshot_bytes * 1.1:
+            self.peak_snapshot = tracemalloc.take_snapshot()
+            self.snapshot_bytes = current
+
+    def _loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self.sample:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                        frame = frame.f_back
+                    self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            if self.trace:
+                self._maybe_snapshot()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def _start_trace(frames: int) -> None:
+    global _trace_users
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _trace_users += 1
+
+
+def _stop_trace() -> int:
+    global _trace_users
+    with _trace_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _trace_users -= 1
+        if _trace_users == 0:
+            tracemalloc.stop()
+    return peak
+
+
+def profile_key_prefix(cfg: AppConfig, source: str, run_id: str, manifests: list[str]) -> str:
+    """
+    Profiles sit next to the run's first manifest, named after it:
+      .../_manifests/source=events/dt=2026-02-18/run_id=abc.cprofile.prof
+    A run that wrote no manifest (nothing new, or failed) is filed under its run_id in
+      env={env}/raw/_manifests/_profiles/source={source}/dt={today}/
+    The suffixes are not .json, so the manifest catalog does not index them.
+    """
+    if manifests:
+        return sorted(manifests)[0].removesuffix(".json")
+    dt = datetime.now(UTC).strftime("%Y-%m-%d")
+    return f"env={cfg.env}/raw/_manifests/_profiles/source={source}/dt={dt}/run_id={run_id}"
+
+
+def profile_run(
+    cfg: AppConfig,
+    s3: S3Client,
+    source: str,
+    run_id: str,
+    fn: Callable[[], list[str]],
+    modes: tuple[str, ...] | None = None,
+) -> list[str]:
+    """
+    Call fn (an entry point's run, given run_id) under the requested profilers and
+    upload their output next to the manifests it returns, or under run_id when
+    there are none. modes defaults to INGEST_PROFILE; with no modes this is just fn().
+
+    cprofile covers the calling thread only; "sample" sees every thread (worker
+    pools included), and with --parallel also the other sources' threads.
+    """
+    if modes is None:
+        modes = parse_modes(os.getenv("INGEST_PROFILE"))
+    if not modes:
+        return fn()
+
+    interval = float(os.getenv("INGEST_PROFILE_INTERVAL_MS", "10")) / 1000
+    sampler = Sampler(interval, sample="sample" in modes, trace="tracemalloc" in modes)
+    prof = None
+    if "tracemalloc" in modes:
+        _start_trace(int(os.getenv("INGEST_PROFILE_TRACEMALLOC_FRAMES", "10")))
+    if "cprofile" in modes:
+        import cProfile
+
+        prof = cProfile.Profile()
+    sampler.start()
+
+    manifests: list[str] = []
+    started = time.perf_counter()
+    if prof is not None:
+        prof.enable()
+    try:
+        manifests = fn()
+        return manifests
+    finally:
+        if prof is not None:
+            prof.disable()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        peak = _stop_trace() if "tracemalloc" in modes else None
+        _upload(cfg, s3, source, run_id, manifests, elapsed, prof, sampler, peak)
+
+
+def _upload(
+    cfg: AppConfig,
+    s3: S3Client,
+    source: str,
+    run_id: str,
+    manifests: list[str],
+    elapsed: float,
+    prof,
+    sampler: Sampler,
+    peak: int | None,
+) -> None:
+    prefix = profile_key_prefix(cfg, source, run_id, manifests)
+    # Per-file runs (events) write manifests under their own run_ids
+    run_ids = sorted({m.group(1) for k in manifests if (m := re.search(r"run_id=([^/.]+)", k))})
+    header = (
+        f"# source={source} run_id={run_id} manifest_run_ids={','.join(run_ids) or '-'}"
+        f" seconds={elapsed:.3f}\n"
+    )
+    keys: list[str] = []
+
+    try:
+        if prof is not None:
+            # pstats format: python -m pstats <file>, snakeviz <file>
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "run.prof")
+                prof.dump_stats(path)
+                with open(path, "rb") as f:
+                    data = f.read()
+            s3.put_bytes(f"{prefix}.cprofile.prof", data, "application/octet-stream")
+            keys.append(f"{prefix}.cprofile.prof")
+
+        if sampler.sample:
+            # No header: flamegraph.pl / speedscope expect folded lines only
+            s3.put_bytes(f"{prefix}.sample.folded", sampler.folded().encode("utf-8"), "text/plain")
+            keys.append(f"{prefix}.sample.folded")
+
+        if peak is not None:
+            top = int(os.getenv("INGEST_PROFILE_TRACEMALLOC_TOP", "25"))
+            lines = [header, f"# peak_traced_bytes={peak}\n"]
+            if sampler.peak_snapshot is not None:
+                lines.append(f"# snapshot_traced_bytes={sampler.snapshot_bytes}\n")
+                for stat in sampler.peak_snapshot.statistics("traceback")[:top]:
+                    lines.append(f"\n{stat.size} bytes in {stat.count} blocks\n")
+                    lines += [
+                        f"  {line}\n" for line in stat.traceback.format(most_recent_first=True)
+                    ]
+            s3.put_bytes(f"{prefix}.tracemalloc.txt", "".join(lines).encode("utf-8"), "text/plain")
+            keys.append(f"{prefix}.tracemalloc.txt")
+    except Exception as e:
+        # Losing a profile must not fail (or mask the error of) the run itself
+        log("profile_upload_failed", source=source, run_id=run_id, error=str(e))
+        return
+
+    log(
+        "profile_uploaded",
+        source=source,
+        run_id=run_id,
+        manifest_run_ids=run_ids,
+        keys=keys,
+        seconds=round(elapsed, 3),
+        samples=sampler.samples if sampler.sample else None,
+        peak_traced_bytes=peak,
+    )
@@ -3,12 +3,12 @@ from __future__ import annotations
 from collections.abc import Callable
 from typing import TypeVar
 
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
-
 T = TypeVar("T")
 
 
 def with_retry(fn: Callable[[], T]) -> T:
+    from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
     wrapped = retry(
         reraise=True,
         stop=stop_after_attempt(5),
@@ -1,29 +1,39 @@
 from __future__ import annotations
 
+import functools
 import hashlib
 import json
+from collections.abc import Iterator
 from dataclasses import dataclass
 
-import boto3
-from botocore.exceptions import ClientError
-
 from .logging import log
 from .retry import with_retry
 
 
+@functools.cache
+def _s3_client(region: str):
+    # boto3 clients are thread-safe; share one per region to reuse its connection pool.
+    # boto3 is imported here, not at module top: it dominates ingest startup time.
+    import boto3
+
+    return boto3.client("s3", region_name=region)
+
+
 @dataclass(frozen=True)
 class S3Client:
     bucket: str
     region: str
 
     def _client(self):
-        return boto3.client("s3", region_name=self.region)
+        return _s3_client(self.region)
 
     @staticmethod
     def sha256_bytes(data: bytes) -> str:
         return hashlib.sha256(data).hexdigest()
 
     def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
         def _do() -> bool:
             try:
                 self._client().head_object(Bucket=self.bucket, Key=key)
@@ -36,6 +46,39 @@ class S3Client:
 
         return with_retry(_do)
 
+    def get_bytes(self, key: str) -> bytes:
+        def _do() -> bytes:
+            obj = self._client().get_object(Bucket=self.bucket, Key=key)
+            return obj["Body"].read()
+
+        return with_retry(_do)
+
+    def list_objects(self, prefix: str, start_after: str = "") -> Iterator[dict]:
+        """
+        Yields {"key", "etag", "last_modified" (ISO8601 UTC), "size"} for every object under prefix.
+        """
+        paginator = self._client().get_paginator("list_objects_v2")
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        if start_after:
+            kwargs["StartAfter"] = start_after
+        for page in paginator.paginate(**kwargs):
+            for obj in page.get("Contents", []):
+                yield {
+                    "key": obj["Key"],
+                    "etag": obj["ETag"],
+                    "last_modified": obj["LastModified"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "size": obj["Size"],
+                }
+
+    def list_prefixes(self, prefix: str) -> Iterator[str]:
+        """
+        Yields the "directories" one level below prefix (each ending in "/").
+        """
+        paginator = self._client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+            for p in page.get("CommonPrefixes", []):
+                yield p["Prefix"]
+
     def put_bytes(self, key: str, data: bytes, content_type: str) -> None:
         def _do() -> None:
             self._client().put_object(
@@ -53,12 +96,17 @@ class S3Client:
         self.put_bytes(key, data, "application/json")
 
     def put_idempotent(
-        self, data_key: str, data: bytes, content_type: str, manifest_key: str
+        self,
+        data_key: str,
+        data: bytes,
+        content_type: str,
+        manifest_key: str,
+        extra: dict | None = None,
     ) -> bool:
         """
         Idempotent write:
         - if manifest exists => skip (already uploaded)
-        - else upload data and write manifest containing sha256 + size
+        - else upload data and write manifest containing sha256 + size (+ extra fields)
         Returns True if uploaded, False if skipped.
         """
         if self.exists(manifest_key):
@@ -69,5 +117,7 @@ class S3Client:
 
         sha = self.sha256_bytes(data)
         self.put_bytes(data_key, data, content_type)
-        self.put_json(manifest_key, {"data_key": data_key, "sha256": sha, "bytes": len(data)})
+        manifest = {"data_key": data_key, "sha256": sha, "bytes": len(data)}
+        manifest.update(extra or {})
+        self.put_json(manifest_key, manifest)
         return True
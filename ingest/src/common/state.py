@@ -1,12 +1,35 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import os
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any
 
 from .logging import log
+from .retry import with_retry
 from .s3 import S3Client
 
+_MISSING = object()
+
+
+class StateConflict(RuntimeError):
+    """Raised when a conditional state write loses a race with another run."""
+
+
+def max_merge(current: dict[str, Any], updates: dict[str, Any]) -> dict[str, Any]:
+    """
+    Merge watermark updates into current state, keeping the larger value per key.
+    Watermarks are ISO8601 UTC strings, so string order is time order.
+    """
+    out = dict(current)
+    for k, v in updates.items():
+        if v is not None and (out.get(k) is None or v > out[k]):
+            out[k] = v
+    return out
+
 
 @dataclass(frozen=True)
 class StateStore:
@@ -14,35 +37,157 @@ class StateStore:
     Stores incremental watermarks in S3.
     State keys are small JSON files under:
       env={env}/raw/_state/{name}.json
+
+    Reads go through a per-process cache (optionally mirrored to cache_dir, and
+    revalidated with a conditional GET). Writes are conditional on the ETag last
+    read, so concurrent runs cannot silently overwrite each other: use update()
+    for compare-and-swap with retries.
     """
 
     s3: S3Client
     env: str
+    cache_dir: str | None = None
+
+    # name -> (value or None if absent, etag or None if absent)
+    _cache: dict[str, tuple[dict[str, Any] | None, str | None]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
 
     def _key(self, name: str) -> str:
         return f"env={self.env}/raw/_state/{name}.json"
 
-    def get(self, name: str) -> dict[str, Any] | None:
-        key = self._key(name)
-        if not self.s3.exists(key):
+    def _disk_path(self, name: str) -> str | None:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"env={self.env}", f"{name}.json")
+
+    def _disk_read(self, name: str) -> tuple[dict[str, Any], str] | None:
+        path = self._disk_path(name)
+        if not path or not os.path.exists(path):
             return None
+        with open(path, encoding="utf-8") as f:
+            rec = json.load(f)
+        return rec["value"], rec["etag"]
+
+    def _disk_write(self, name: str, value: dict[str, Any], etag: str) -> None:
+        path = self._disk_path(name)
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"etag": etag, "value": value}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _fetch(self, name: str) -> tuple[dict[str, Any] | None, str | None]:
+        key = self._key(name)
+        disk = self._disk_read(name)
+        from botocore.exceptions import ClientError
+
+        def _do() -> tuple[dict[str, Any] | None, str | None]:
+            kwargs: dict[str, Any] = {"Bucket": self.s3.bucket, "Key": key}
+            if disk:
+                kwargs["IfNoneMatch"] = disk[1]
+            try:
+                obj = self.s3._client().get_object(**kwargs)
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code in ("304", "NotModified") and disk:
+                    return disk
+                if code in ("404", "NoSuchKey", "NotFound"):
+                    return None, None
+                raise
+            value = json.loads(obj["Body"].read().decode("utf-8"))
+            return value, obj["ETag"]
+
+        value, etag = with_retry(_do)
+        if value is not None and etag is not None and (not disk or disk[1] != etag):
+            self._disk_write(name, value, etag)
+        return value, etag
 
-        def _do() -> dict[str, Any]:
-            import boto3
+    def get(self, name: str, refresh: bool = False) -> dict[str, Any] | None:
+        with self._lock:
+            cached = self._cache.get(name, _MISSING)
+        if cached is not _MISSING and not refresh:
+            return cached[0]
 
-            obj = boto3.client("s3", region_name=self.s3.region).get_object(
-                Bucket=self.s3.bucket, Key=key
-            )
-            data = obj["Body"].read().decode("utf-8")
-            return json.loads(data)
+        value, etag = self._fetch(name)
+        with self._lock:
+            self._cache[name] = (value, etag)
+        log("state_get", name=name, key=self._key(name), found=value is not None)
+        return value
 
-        out = _do()
-        log("state_get", name=name, key=key)
-        return out
+    def get_many(
+        self, names: Iterable[str], max_workers: int = 8
+    ) -> dict[str, dict[str, Any] | None]:
+        names = list(names)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names) or 1))) as pool:
+            values = list(pool.map(self.get, names))
+        return dict(zip(names, values, strict=True))
 
     def put(self, name: str, value: dict[str, Any]) -> None:
+        """
+        Write state. If this process has read `name`, the write only succeeds when
+        the stored object is unchanged since that read; otherwise StateConflict.
+        """
         key = self._key(name)
-        self.s3.put_bytes(
-            key, json.dumps(value, ensure_ascii=False).encode("utf-8"), "application/json"
-        )
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            cached = self._cache.get(name, _MISSING)
+
+        conditions: dict[str, str] = {}
+        if cached is not _MISSING:
+            etag = cached[1]
+            conditions = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        from botocore.exceptions import ClientError
+
+        def _do() -> str | None:
+            try:
+                resp = self.s3._client().put_object(
+                    Bucket=self.s3.bucket,
+                    Key=key,
+                    Body=data,
+                    ContentType="application/json",
+                    **conditions,
+                )
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code in ("PreconditionFailed", "412", "ConditionalRequestConflict", "409"):
+                    return None
+                raise
+            return resp["ETag"]
+
+        new_etag = with_retry(_do)
+        if new_etag is None:
+            with self._lock:
+                self._cache.pop(name, None)
+            log("state_conflict", name=name, key=key, conditions=conditions)
+            raise StateConflict(f"State {name} changed since it was read")
+
+        with self._lock:
+            self._cache[name] = (value, new_etag)
+        self._disk_write(name, value, new_etag)
         log("state_put", name=name, key=key, value=value)
+
+    def update(
+        self,
+        name: str,
+        fn: Callable[[dict[str, Any]], dict[str, Any]],
+        retries: int = 5,
+    ) -> dict[str, Any]:
+        """
+        Compare-and-swap: apply fn to the latest state and write it conditionally,
+        re-reading and re-applying fn whenever another writer got there first.
+        """
+        for attempt in range(retries):
+            current = self.get(name, refresh=attempt > 0) or {}
+            new_value = fn(dict(current))
+            try:
+                self.put(name, new_value)
+                return new_value
+            except StateConflict:
+                log("state_update_retry", name=name, attempt=attempt + 1)
+        raise StateConflict(f"State {name} update lost {retries} races in a row")
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+import orjson
+
+# Event payload contract (docs/DATA_CONTRACTS.md, 1.2): field -> (accepted types, required)
+EVENT_FIELDS: dict[str, tuple[tuple[type, ...], bool]] = {
+    "schema_version": ((int,), False),
+    "event_id": ((str,), True),
+    "idempotency_key": ((str,), False),
+    "event_type": ((str,), True),
+    "event_ts": ((str,), True),
+    "received_ts": ((str,), False),
+    "customer_id": ((int, str), False),
+    "session_id": ((str,), False),
+    "platform": ((str,), False),
+    "country_code": ((str,), False),
+    "sku": ((str,), False),
+    "quantity": ((int,), False),
+    "revenue_cents": ((int,), False),
+    "campaign_id": ((str,), False),
+    "url": ((str,), False),
+    "user_agent": ((str,), False),
+    "ip_address": ((str,), False),
+}
+
+
+class InvalidEvent(ValueError):
+    pass
+
+
+def parse_event_ts(ts: str) -> datetime:
+    if not ts.endswith("Z"):
+        raise InvalidEvent(f"event_ts must be UTC ISO8601 ending with Z: {ts!r}")
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError as e:
+        raise InvalidEvent(f"event_ts is not ISO8601: {ts!r}") from e
+
+
+def validate_event(line: bytes) -> dict[str, Any]:
+    try:
+        obj = orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        raise InvalidEvent(f"invalid JSON: {e}") from e
+    if not isinstance(obj, dict):
+        raise InvalidEvent("event is not a JSON object")
+
+    for name, (types, required) in EVENT_FIELDS.items():
+        v = obj.get(name)
+        if v is None:
+            if required:
+                raise InvalidEvent(f"missing required field: {name}")
+            continue
+        # bool is an int subclass; never a valid value for these fields
+        if isinstance(v, bool) or not isinstance(v, types):
+            raise InvalidEvent(f"{name} has type {type(v).__name__}")
+
+    parse_event_ts(obj["event_ts"])
+    return obj
+
+
+@dataclass
+class EventProfile:
+    """
+    Single-pass profile of a validated event stream, written into the manifest.
+    """
+
+    rows: int = 0
+    min_event_ts: str | None = None
+    max_event_ts: str | None = None
+    null_counts: dict[str, int] = field(default_factory=lambda: dict.fromkeys(EVENT_FIELDS, 0))
+
+    def add(self, obj: dict[str, Any]) -> None:
+        self.rows += 1
+        ts = obj["event_ts"]
+        # event_ts is validated ISO8601 UTC, so string order is time order
+        if self.min_event_ts is None or ts < self.min_event_ts:
+            self.min_event_ts = ts
+        if self.max_event_ts is None or ts > self.max_event_ts:
+            self.max_event_ts = ts
+        for name in self.null_counts:
+            if obj.get(name) is None:
+                self.null_counts[name] += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "min_event_ts": self.min_event_ts,
+            "max_event_ts": self.max_event_ts,
+            "null_counts": {k: v for k, v in self.null_counts.items() if v},
+        }
+
+
+def quarantine_record(line_no: int, line: bytes, error: str) -> bytes:
+    rec = {"line_no": line_no, "error": error, "raw": line.decode("utf-8", errors="replace")}
+    return orjson.dumps(rec) + b"\n"
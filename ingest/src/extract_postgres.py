@@ -1,22 +1,28 @@
 from __future__ import annotations
 
 import json
+import os
 import uuid
 from datetime import UTC, datetime, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import psycopg
 from src.common.config import AppConfig
 from src.common.logging import log, log_exc
+from src.common.pg_cdc import ensure_slot, extract_changes
+from src.common.pg_diff import extract_table_diff
+from src.common.profiling import profile_run
 from src.common.s3 import S3Client
-from src.common.state import StateStore
+from src.common.state import StateStore, max_merge
+
+if TYPE_CHECKING:
+    import psycopg
 
 TABLES = [
     ("customers", "updated_at"),
     ("products", "updated_at"),
     ("orders", "updated_at"),
-    ("order_items", None),  # no updated_at; extracted fully each run (small)
-    ("payments", None),  # no updated_at; extracted fully each run (small)
+    ("order_items", None),  # no updated_at; extracted fully (or diffed) each run
+    ("payments", None),  # no updated_at; extracted fully (or diffed) each run
 ]
 
 
@@ -52,67 +58,136 @@ def fetch_rows(
     return out
 
 
-def main() -> None:
-    cfg = AppConfig.load()
-    run_id = uuid.uuid4().hex
-    now = datetime.now(UTC)
-    dt = dt_partition(now)
-
-    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
-    state = StateStore(s3=s3, env=cfg.env)
+def extract_tables(
+    conn: psycopg.Connection,
+    cfg: AppConfig,
+    s3: S3Client,
+    state: StateStore,
+    run_id: str,
+    dt: str,
+    full: bool = False,
+) -> list[str]:
+    """
+    Poll every table in TABLES (from its watermark, or fully when full=True) and
+    advance the watermarks. Returns the manifest keys written.
+
+    With PG_FULL_TABLE_MODE=diff, tables without a watermark column ship only
+    the rows inserted, updated or deleted since the previous run.
+    """
+    full_table_mode = os.getenv("PG_FULL_TABLE_MODE", "full")
+    if full_table_mode not in ("full", "diff"):
+        raise ValueError(f"PG_FULL_TABLE_MODE must be 'full' or 'diff', got {full_table_mode!r}")
 
     state_name = "postgres_watermarks"
-    current_state = state.get(state_name) or {}
+    current_state = {} if full else state.get(state_name) or {}
 
     # 5-minute lookback to handle small clock skews / late updates
     lookback = timedelta(minutes=5)
 
-    dsn = f"host={cfg.pg_host} port={cfg.pg_port} dbname={cfg.pg_db} user={cfg.pg_user} password={cfg.pg_password}"
-    log("postgres_connect", host=cfg.pg_host, db=cfg.pg_db)
+    watermarks: dict[str, Any] = {}
+    manifests: list[str] = []
 
-    try:
-        with psycopg.connect(dsn) as conn:
-            new_state: dict[str, Any] = dict(current_state)
+    for table, wm_col in TABLES:
+        if wm_col is None and full_table_mode == "diff" and not full:
+            manifest_key = extract_table_diff(conn, s3, cfg.env, table, run_id, dt)
+            if manifest_key:
+                manifests.append(manifest_key)
+            continue
+
+        wm_str = current_state.get(table)
+        wm = datetime.fromisoformat(wm_str.replace("Z", "+00:00")) if wm_str else None
+        effective_wm = (wm - lookback) if wm else None
+
+        rows = fetch_rows(conn, table, wm_col, effective_wm)
+        log("postgres_extract", table=table, rows=len(rows), watermark=wm_str)
+
+        # Serialize as JSONL
+        payload = b"".join((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in rows)
+
+        data_key = f"env={cfg.env}/raw/source=postgres/table={table}/dt={dt}/run_id={run_id}.jsonl"
+        manifest_key = f"env={cfg.env}/raw/_manifests/source=postgres/table={table}/dt={dt}/run_id={run_id}.json"
+
+        uploaded = s3.put_idempotent(
+            data_key=data_key,
+            data=payload,
+            content_type="application/json",
+            manifest_key=manifest_key,
+        )
+
+        # Update watermark if table is incremental and we uploaded rows
+        if wm_col and rows:
+            max_ts = max(r[wm_col] for r in rows if wm_col in r and r[wm_col])
+            watermarks[table] = max_ts
 
-            for table, wm_col in TABLES:
-                wm_str = current_state.get(table)
-                wm = datetime.fromisoformat(wm_str.replace("Z", "+00:00")) if wm_str else None
-                effective_wm = (wm - lookback) if wm else None
+        if uploaded:
+            manifests.append(manifest_key)
+        log("postgres_upload_done", table=table, uploaded=uploaded, data_key=data_key)
 
-                rows = fetch_rows(conn, table, wm_col, effective_wm)
-                log("postgres_extract", table=table, rows=len(rows), watermark=wm_str)
+    # CAS merge: a concurrent run may have advanced other watermarks meanwhile
+    state.update(state_name, lambda cur: max_merge(cur, watermarks))
+    return manifests
 
-                # Serialize as JSONL
-                payload = b"".join(
-                    (json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in rows
-                )
 
-                data_key = (
-                    f"env={cfg.env}/raw/source=postgres/table={table}/dt={dt}/run_id={run_id}.jsonl"
-                )
-                manifest_key = f"env={cfg.env}/raw/_manifests/source=postgres/table={table}/dt={dt}/run_id={run_id}.json"
+def run(cfg: AppConfig, s3: S3Client, run_id: str | None = None) -> list[str]:
+    """
+    Extract every table in TABLES once, as run_id (default: a new one). Returns the
+    manifest keys written.
+
+    PG_EXTRACT_MODE=poll (default) polls each table from its updated_at watermark.
+    PG_EXTRACT_MODE=cdc reads committed changes (including deletes) from a wal2json
+    logical replication slot instead. The tables are snapshotted in full once the slot
+    exists, so the change stream has a starting point; the snapshot is recorded in the
+    postgres_cdc_seeded state only after it succeeds, and retried until then.
+    """
+    run_id = run_id or uuid.uuid4().hex
+    now = datetime.now(UTC)
+    dt = dt_partition(now)
+    mode = os.getenv("PG_EXTRACT_MODE", "poll")
+    if mode not in ("poll", "cdc"):
+        raise ValueError(f"PG_EXTRACT_MODE must be 'poll' or 'cdc', got {mode!r}")
 
-                uploaded = s3.put_idempotent(
-                    data_key=data_key,
-                    data=payload,
-                    content_type="application/json",
-                    manifest_key=manifest_key,
-                )
+    state = StateStore(s3=s3, env=cfg.env, cache_dir=cfg.state_cache_dir or None)
 
-                # Update watermark if table is incremental and we uploaded rows
-                if wm_col and rows:
-                    max_ts = max(r[wm_col] for r in rows if wm_col in r and r[wm_col])
-                    new_state[table] = max_ts
+    dsn = f"host={cfg.pg_host} port={cfg.pg_port} dbname={cfg.pg_db} user={cfg.pg_user} password={cfg.pg_password}"
+    log("postgres_connect", host=cfg.pg_host, db=cfg.pg_db, mode=mode)
 
-                log("postgres_upload_done", table=table, uploaded=uploaded, data_key=data_key)
+    import psycopg
 
-            state.put(state_name, new_state)
-            log("postgres_done", run_id=run_id, dt=dt)
+    try:
+        # Slot functions cannot run in a transaction that has already done work
+        with psycopg.connect(dsn, autocommit=mode == "cdc") as conn:
+            if mode == "cdc":
+                slot = os.getenv("PG_CDC_SLOT", "dp_mailblaze_cdc")
+                manifests: list[str] = []
+                created = ensure_slot(conn, slot)
+                # The baseline snapshot is retried on every run until one completes: a
+                # snapshot that failed after the slot was created must not be skipped
+                seeded = (state.get("postgres_cdc_seeded") or {}).get(slot)
+                if created or not seeded:
+                    manifests += extract_tables(conn, cfg, s3, state, run_id, dt, full=True)
+                    state.update(
+                        "postgres_cdc_seeded",
+                        lambda cur: {**cur, slot: {"run_id": run_id, "seeded_at": iso_z(now)}},
+                    )
+                    log("pg_cdc_seeded", slot=slot, run_id=run_id, slot_created=created)
+                manifests += extract_changes(conn, cfg, s3, state, slot, [t for t, _ in TABLES])
+            else:
+                manifests = extract_tables(conn, cfg, s3, state, run_id, dt)
+
+            log("postgres_done", run_id=run_id, dt=dt, mode=mode)
+            return manifests
 
     except Exception as e:
         log_exc("postgres_failed", e, run_id=run_id)
         raise
 
 
+def main() -> None:
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+    run_id = uuid.uuid4().hex
+    profile_run(cfg, s3, "postgres", run_id, lambda: run(cfg, s3, run_id=run_id))
+
+
 if __name__ == "__main__":
     main()
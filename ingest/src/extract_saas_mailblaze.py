@@ -5,11 +5,11 @@ import uuid
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
-import requests
 from src.common.config import AppConfig
 from src.common.logging import log, log_exc
+from src.common.profiling import profile_run
 from src.common.s3 import S3Client
-from src.common.state import StateStore
+from src.common.state import StateStore, max_merge
 
 
 def dt_partition(now: datetime) -> str:
@@ -27,6 +27,8 @@ def fetch_paginated(
     api_key: str,
     limit: int,
 ) -> list[dict[str, Any]]:
+    import requests
+
     out: list[dict[str, Any]] = []
     cursor: str | None = None
 
@@ -54,14 +56,16 @@ def fetch_paginated(
     return out
 
 
-def main() -> None:
-    cfg = AppConfig.load()
-    run_id = uuid.uuid4().hex
+def run(cfg: AppConfig, s3: S3Client, run_id: str | None = None) -> list[str]:
+    """
+    Extract campaigns and email events since the stored watermarks, as run_id
+    (default: a new one). Returns the manifest keys written.
+    """
+    run_id = run_id or uuid.uuid4().hex
     now = datetime.now(UTC)
     dt = dt_partition(now)
 
-    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
-    state = StateStore(s3=s3, env=cfg.env)
+    state = StateStore(s3=s3, env=cfg.env, cache_dir=cfg.state_cache_dir or None)
 
     state_name = "saas_mailblaze_watermarks"
     current_state = state.get(state_name) or {}
@@ -106,29 +110,43 @@ def main() -> None:
 
         c_data_key = f"env={cfg.env}/raw/source=saas_mailblaze/entity=campaigns/dt={dt}/run_id={run_id}.jsonl"
         c_manifest_key = f"env={cfg.env}/raw/_manifests/source=saas_mailblaze/entity=campaigns/dt={dt}/run_id={run_id}.json"
-        s3.put_idempotent(c_data_key, to_jsonl(campaigns), "application/json", c_manifest_key)
+        manifests: list[str] = []
+        if s3.put_idempotent(c_data_key, to_jsonl(campaigns), "application/json", c_manifest_key):
+            manifests.append(c_manifest_key)
 
         e_data_key = f"env={cfg.env}/raw/source=saas_mailblaze/entity=email_events/dt={dt}/run_id={run_id}.jsonl"
         e_manifest_key = f"env={cfg.env}/raw/_manifests/source=saas_mailblaze/entity=email_events/dt={dt}/run_id={run_id}.json"
-        s3.put_idempotent(e_data_key, to_jsonl(email_events), "application/json", e_manifest_key)
+        if s3.put_idempotent(
+            e_data_key, to_jsonl(email_events), "application/json", e_manifest_key
+        ):
+            manifests.append(e_manifest_key)
 
-        new_state = dict(current_state)
+        watermarks: dict[str, Any] = {}
 
         if campaigns:
             max_updated = max(c["updated_at"] for c in campaigns if c.get("updated_at"))
-            new_state["campaigns_updated_after"] = max_updated
+            watermarks["campaigns_updated_after"] = max_updated
 
         if email_events:
             max_occ = max(e["occurred_at"] for e in email_events if e.get("occurred_at"))
-            new_state["email_events_occurred_after"] = max_occ
+            watermarks["email_events_occurred_after"] = max_occ
 
-        state.put(state_name, new_state)
+        # CAS merge: never move a watermark backwards if a concurrent run advanced it
+        new_state = state.update(state_name, lambda cur: max_merge(cur, watermarks))
         log("saas_done", run_id=run_id, new_state=new_state)
+        return manifests
 
     except Exception as e:
         log_exc("saas_failed", e, run_id=run_id)
         raise
 
 
+def main() -> None:
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+    run_id = uuid.uuid4().hex
+    profile_run(cfg, s3, "saas", run_id, lambda: run(cfg, s3, run_id=run_id))
+
+
 if __name__ == "__main__":
     main()
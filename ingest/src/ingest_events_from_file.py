@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 import glob
+import hashlib
 import os
 import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import UTC, datetime
-from pathlib import Path
 
 from src.common.config import AppConfig
 from src.common.logging import log, log_exc
+from src.common.partition import Partition, PartitionedWriter, Uploader
+from src.common.profiling import profile_run
 from src.common.s3 import S3Client
+from src.common.validate import (
+    EventProfile,
+    InvalidEvent,
+    parse_event_ts,
+    quarantine_record,
+    validate_event,
+)
 
 
 def dt_partition(now: datetime) -> str:
@@ -26,39 +38,258 @@ def guess_dt_from_filename(fp: str) -> str:
     return dt_partition(datetime.now(UTC))
 
 
-def main() -> None:
-    cfg = AppConfig.load()
-    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+def event_time_partition(event_ts: str) -> Partition:
+    # 2026-02-18T23:59:58Z -> (("dt", "2026-02-18"), ("hour", "23"))
+    ts = parse_event_ts(event_ts).astimezone(UTC)
+    return (("dt", f"{ts.year:04d}-{ts.month:02d}-{ts.day:02d}"), ("hour", f"{ts.hour:02d}"))
+
+
+SHARD_KEYS = ("idempotency_key", "customer_id")
+
+
+def shard_of(obj: dict, shard_key: str, shards: int) -> int:
+    # crc32 is stable across processes (unlike hash()), so replays land in the same shard
+    v = obj.get(shard_key)
+    if v is None:
+        v = obj["event_id"]
+    return zlib.crc32(str(v).encode("utf-8")) % shards
+
+
+def file_run_id(fp: str) -> str:
+    """
+    A file's run_id, derived from its identity (name, size, mtime) like the watch
+    ledger: the flow and the watcher see the same id for the same landed file, and
+    re-ingesting it after a partial failure rewrites the same keys.
+    """
+    st = os.stat(fp)
+    identity = f"{os.path.basename(fp)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+
+
+def ingested_prefix(cfg: AppConfig) -> str:
+    return f"env={cfg.env}/raw/_state/ingested_files/source=events/"
+
+
+def ingested_key(cfg: AppConfig, run_id: str) -> str:
+    # Written once every manifest of the file is: from then on the file is skipped
+    return f"{ingested_prefix(cfg)}run_id={run_id}.json"
+
+
+@dataclass
+class ValidatedFile:
+    """
+    An events file after its validation pass: the writer may still hold buffered
+    lines and have part uploads in flight until finish_file() closes it.
+    """
+
+    fp: str
+    run_id: str
+    landing_dt: str
+    shards: int
+    shard_key: str
+    writer: PartitionedWriter
+    quarantine: PartitionedWriter
+    profiles: dict[str, EventProfile]
+    bad_rows: int
+
+
+def validate_file(
+    cfg: AppConfig, s3: S3Client, fp: str, uploader: Uploader | None = None
+) -> ValidatedFile:
+    """
+    Single streaming pass over an events file: validate each line, route valid
+    lines to the dt=/hour= partition of their event_ts (and to a hash shard of
+    EVENTS_SHARD_KEY when EVENTS_SHARDS > 1), quarantine the rest. Valid and
+    quarantined lines roll over into parts the same way, and full parts are
+    handed to uploader (inline without one) as soon as they roll over.
+    """
+    landing_dt = guess_dt_from_filename(fp)
+    run_id = file_run_id(fp)
+
+    shards = int(os.getenv("EVENTS_SHARDS", "1"))
+    shard_key = os.getenv("EVENTS_SHARD_KEY", "idempotency_key")
+    if shards < 1:
+        raise ValueError(f"EVENTS_SHARDS must be >= 1, got {shards}")
+    if shard_key not in SHARD_KEYS:
+        raise ValueError(f"EVENTS_SHARD_KEY must be one of {SHARD_KEYS}, got {shard_key!r}")
 
-    input_glob = os.getenv("EVENTS_INPUT_GLOB", "/data/events/*.jsonl")
+    part_max_bytes = int(os.getenv("EVENTS_PART_MAX_BYTES", str(128 * 1024 * 1024)))
+    writer = PartitionedWriter(
+        s3=s3,
+        prefix=f"env={cfg.env}/raw/source=events",
+        run_id=run_id,
+        part_max_bytes=part_max_bytes,
+        buffer_max_bytes=int(os.getenv("EVENTS_BUFFER_MAX_BYTES", str(512 * 1024 * 1024))),
+        uploader=uploader,
+    )
+    # One partition (the landing date), so at most one part's worth is buffered
+    quarantine = PartitionedWriter(
+        s3=s3,
+        prefix=f"env={cfg.env}/raw/_quarantine/source=events",
+        run_id=run_id,
+        part_max_bytes=part_max_bytes,
+        uploader=uploader,
+    )
+    quarantine_partition: Partition = (("dt", landing_dt),)
+    profiles: dict[str, EventProfile] = {}
+    bad_rows = 0
+
+    with open(fp, "rb") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = validate_event(line)
+            except InvalidEvent as e:
+                bad_rows += 1
+                quarantine.write(
+                    quarantine_partition,
+                    quarantine_record(line_no, line.rstrip(b"\r\n"), str(e)),
+                )
+                continue
+
+            partition = event_time_partition(obj["event_ts"])
+            if shards > 1:
+                partition += (("shard", f"{shard_of(obj, shard_key, shards):03d}"),)
+            dt = partition[0][1]
+            profile = profiles.get(dt)
+            if profile is None:
+                profile = profiles[dt] = EventProfile()
+            profile.add(obj)
+            writer.write(partition, line if line.endswith(b"\n") else line + b"\n")
+
+    return ValidatedFile(
+        fp, run_id, landing_dt, shards, shard_key, writer, quarantine, profiles, bad_rows
+    )
+
+
+def finish_file(cfg: AppConfig, s3: S3Client, v: ValidatedFile) -> list[str]:
+    """
+    Upload what is left of a validated file and wait for all of its parts
+    (quarantine included), then write one manifest per event date touched, so a
+    manifest never lists a missing object. A file with no valid line still gets
+    one, with no parts, under its landing date: its bad rows stay visible in the
+    catalog, and an all-garbage input does not look like "nothing to do".
+    """
+    fp, run_id = v.fp, v.run_id
+    parts = v.writer.close()
+    quarantine_parts = [p.to_dict() for p in v.quarantine.close()]
+    if quarantine_parts:
+        log(
+            "events_quarantined",
+            file=fp,
+            bad_rows=v.bad_rows,
+            keys=[p["key"] for p in quarantine_parts],
+        )
+
+    manifests: list[str] = []
+    profiles = v.profiles or {v.landing_dt: EventProfile()}
+    for dt, profile in sorted(profiles.items()):
+        dt_parts = [p.to_dict() for p in parts if p.partition[0][1] == dt]
+        manifest_key = f"env={cfg.env}/raw/_manifests/source=events/dt={dt}/run_id={run_id}.json"
+        s3.put_json(
+            manifest_key,
+            {
+                "run_id": run_id,
+                "shards": v.shards,
+                "shard_key": v.shard_key if v.shards > 1 else None,
+                "parts": dt_parts,
+                "rows": sum(p["rows"] for p in dt_parts),
+                "bytes": sum(p["bytes"] for p in dt_parts),
+                "source_file": os.path.basename(fp),
+                "validated": True,
+                "profile": profile.to_dict(),
+                "file_bad_rows": v.bad_rows,
+                "quarantine_parts": quarantine_parts,
+            },
+        )
+        manifests.append(manifest_key)
+
+    s3.put_json(
+        ingested_key(cfg, run_id),
+        {"run_id": run_id, "source_file": os.path.basename(fp), "manifests": manifests},
+    )
+    log(
+        "events_uploaded",
+        file=fp,
+        run_id=run_id,
+        dts=sorted(v.profiles),
+        parts=len(parts),
+        rows=sum(p.rows for p in parts),
+        bad_rows=v.bad_rows,
+    )
+    return manifests
+
+
+def ingest_file(cfg: AppConfig, s3: S3Client, fp: str) -> list[str]:
+    """
+    Validate, repartition and upload one events file. Returns its manifest keys,
+    or nothing if this file (same name, size and mtime) was already ingested.
+    """
+    run_id = file_run_id(fp)
+    if s3.exists(ingested_key(cfg, run_id)):
+        log("events_skip_ingested", file=fp, run_id=run_id)
+        return []
+    return finish_file(cfg, s3, validate_file(cfg, s3, fp))
+
+
+def run(
+    cfg: AppConfig, s3: S3Client, input_glob: str | None = None, run_id: str | None = None
+) -> list[str]:
+    """
+    Ingest every file matching input_glob that was not ingested before. Returns
+    the manifest keys written. Each file is its own run with its own run_id in its
+    keys (see file_run_id); run_id only tags this batch's logs.
+
+    Validation is CPU-bound and holds the GIL, so validating files on several
+    threads gains nothing. Files are instead validated one at a time on this
+    thread, while part uploads (EVENTS_UPLOAD_WORKERS threads, at most
+    EVENTS_UPLOADS_IN_FLIGHT queued) and the previous file's final flush and
+    manifests run in the background. At most two files are buffered at once.
+    """
+    input_glob = input_glob or os.getenv("EVENTS_INPUT_GLOB", "/data/events/*.jsonl")
+    workers = int(os.getenv("EVENTS_UPLOAD_WORKERS", "4"))
+    in_flight = int(os.getenv("EVENTS_UPLOADS_IN_FLIGHT", str(2 * workers)))
     files = sorted(glob.glob(input_glob))
+    if files:
+        # One listing instead of a HEAD per landed file
+        done = {obj["key"] for obj in s3.list_objects(ingested_prefix(cfg))}
+        pending = [fp for fp in files if ingested_key(cfg, file_run_id(fp)) not in done]
+        if len(pending) < len(files):
+            log("events_skip_ingested", files=len(files) - len(pending), run_id=run_id)
+        files = pending
 
     if not files:
-        log("events_no_files", input_glob=input_glob)
-        return
+        log("events_no_files", input_glob=input_glob, run_id=run_id)
+        return []
 
+    manifests: list[str] = []
+    uploader = Uploader(s3, workers=workers, max_in_flight=in_flight)
+    finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="events-finish")
     try:
+        previous = None
         for fp in files:
-            dt = guess_dt_from_filename(fp)
-            run_id = uuid.uuid4().hex
-            data = Path(fp).read_bytes()
-
-            data_key = f"env={cfg.env}/raw/source=events/dt={dt}/run_id={run_id}.jsonl"
-            manifest_key = (
-                f"env={cfg.env}/raw/_manifests/source=events/dt={dt}/run_id={run_id}.json"
-            )
-
-            uploaded = s3.put_idempotent(
-                data_key=data_key,
-                data=data,
-                content_type="application/x-ndjson",
-                manifest_key=manifest_key,
-            )
-            log("events_uploaded", file=fp, dt=dt, uploaded=uploaded, data_key=data_key)
+            validated = validate_file(cfg, s3, fp, uploader)
+            if previous is not None:
+                manifests += previous.result()
+            previous = finisher.submit(finish_file, cfg, s3, validated)
+        manifests += previous.result()
 
     except Exception as e:
-        log_exc("events_failed", e)
+        log_exc("events_failed", e, run_id=run_id)
         raise
+    finally:
+        finisher.shutdown(wait=True)
+        uploader.close()
+
+    return manifests
+
+
+def main() -> None:
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+    run_id = uuid.uuid4().hex
+    profile_run(cfg, s3, "events", run_id, lambda: run(cfg, s3, run_id=run_id))
 
 
 if __name__ == "__main__":
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import glob
 import os
+import uuid
 from pathlib import Path
 
 from src.common.config import AppConfig
 from src.common.logging import log, log_exc
+from src.common.profiling import profile_run
 from src.common.s3 import S3Client
 
 
@@ -18,35 +20,66 @@ def parse_dt_from_filename(path: str) -> str:
     return parts[-1]
 
 
-def main() -> None:
-    cfg = AppConfig.load()
-    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+def snapshot_name(path: str) -> str:
+    # inventory_snapshot_YYYY-MM-DD.csv -> inventory_snapshot
+    # inventory_snapshot_WH_EU_01_YYYY-MM-DD.csv -> inventory_snapshot_WH_EU_01 (warehouse shard)
+    base = os.path.basename(path)
+    return base.replace(".csv", "").rsplit("_", 1)[0]
+
+
+def ingest_file(cfg: AppConfig, s3: S3Client, fp: str) -> list[str]:
+    """
+    Upload one snapshot file. Returns the manifest key, or nothing if it was already uploaded.
+    """
+    dt = parse_dt_from_filename(fp)
+    name = snapshot_name(fp)
+    data_key = f"env={cfg.env}/raw/source=3pl_inventory/dt={dt}/{name}.csv"
+    manifest_key = f"env={cfg.env}/raw/_manifests/source=3pl_inventory/dt={dt}/{name}.json"
+    # Snapshots already landed are skipped before their file is even read
+    if s3.exists(manifest_key):
+        log("inventory_skip_existing", file=fp, dt=dt, manifest_key=manifest_key)
+        return []
+
+    data = Path(fp).read_bytes()
+    uploaded = s3.put_idempotent(
+        data_key=data_key, data=data, content_type="text/csv", manifest_key=manifest_key
+    )
+    log("inventory_uploaded", file=fp, dt=dt, uploaded=uploaded, data_key=data_key)
+    return [manifest_key] if uploaded else []
 
-    input_dir = os.getenv("INVENTORY_INPUT_DIR", "/data/inventory")
+
+def run(
+    cfg: AppConfig, s3: S3Client, input_dir: str | None = None, run_id: str | None = None
+) -> list[str]:
+    """
+    Ingest every inventory snapshot in input_dir. Returns the manifest keys written.
+    Keys are named after the snapshot files; run_id only tags this batch's logs.
+    """
+    input_dir = input_dir or os.getenv("INVENTORY_INPUT_DIR", "/data/inventory")
     files = sorted(glob.glob(os.path.join(input_dir, "inventory_snapshot_*.csv")))
 
     if not files:
-        log("inventory_no_files", input_dir=input_dir)
-        return
+        log("inventory_no_files", input_dir=input_dir, run_id=run_id)
+        return []
 
+    manifests: list[str] = []
     try:
         for fp in files:
-            dt = parse_dt_from_filename(fp)
-            data = Path(fp).read_bytes()
-
-            data_key = f"env={cfg.env}/raw/source=3pl_inventory/dt={dt}/inventory_snapshot.csv"
-            manifest_key = (
-                f"env={cfg.env}/raw/_manifests/source=3pl_inventory/dt={dt}/inventory_snapshot.json"
-            )
-            uploaded = s3.put_idempotent(
-                data_key=data_key, data=data, content_type="text/csv", manifest_key=manifest_key
-            )
-            log("inventory_uploaded", file=fp, dt=dt, uploaded=uploaded, data_key=data_key)
+            manifests += ingest_file(cfg, s3, fp)
 
     except Exception as e:
-        log_exc("inventory_failed", e)
+        log_exc("inventory_failed", e, run_id=run_id)
         raise
 
+    return manifests
+
+
+def main() -> None:
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+    run_id = uuid.uuid4().hex
+    profile_run(cfg, s3, "inventory", run_id, lambda: run(cfg, s3, run_id=run_id))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Any
+
+from src.common.catalog import ManifestCatalog
+from src.common.config import AppConfig
+from src.common.logging import log_exc
+from src.common.s3 import S3Client
+
+
+def _emit(rows: list[dict[str, Any]] | dict[str, Any] | None) -> None:
+    for row in rows if isinstance(rows, list) else [rows]:
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Query the local index of ingest manifests")
+    p.add_argument(
+        "--db",
+        default=os.getenv("CATALOG_DB_PATH", "/data/catalog/manifests.sqlite"),
+        help="SQLite catalog path",
+    )
+    p.add_argument("--no-sync", action="store_true", help="Query without syncing from S3 first")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("sync", help="Index manifests written since the last sync")
+    s.add_argument("--source")
+    s.add_argument(
+        "--full",
+        action="store_true",
+        help="List every manifest, not just recent dt partitions (after backfills)",
+    )
+
+    f = sub.add_parser("files", help="Data files loaded for a source / entity / dt / run")
+    f.add_argument("--source")
+    f.add_argument("--entity")
+    f.add_argument("--dt")
+    f.add_argument("--run-id")
+
+    r = sub.add_parser("runs", help="Runs, newest first")
+    r.add_argument("--source")
+    r.add_argument("--dt")
+    r.add_argument("--limit", type=int, default=100)
+
+    k = sub.add_parser("find-key", help="Which run/manifest produced a data key")
+    k.add_argument("data_key")
+
+    n = sub.add_parser("since", help="Manifests written at or after a timestamp")
+    n.add_argument("last_modified", help="ISO8601 UTC, e.g. 2026-02-18T09:00:00Z")
+
+    args = p.parse_args()
+    catalog = ManifestCatalog(args.db)
+
+    try:
+        if args.cmd == "sync" or not args.no_sync:
+            cfg = AppConfig.load()
+            s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+            catalog.sync(
+                s3,
+                cfg.env,
+                source=getattr(args, "source", None),
+                full=True if getattr(args, "full", False) else None,
+            )
+
+        if args.cmd == "files":
+            _emit(catalog.files(args.source, args.entity, args.dt, args.run_id))
+        elif args.cmd == "runs":
+            _emit(catalog.runs(args.source, args.dt, args.limit))
+        elif args.cmd == "find-key":
+            _emit(catalog.find_key(args.data_key))
+        elif args.cmd == "since":
+            _emit(catalog.manifests_since(args.last_modified))
+
+    except Exception as e:
+        log_exc("catalog_failed", e, cmd=args.cmd)
+        raise
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import fnmatch
+import glob
+import json
+import os
+import signal
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import ingest_events_from_file, ingest_inventory_csv
+from src.common.config import AppConfig
+from src.common.logging import log, log_exc
+from src.common.s3 import S3Client
+
+IngestFn = Callable[[AppConfig, S3Client, str], list[str]]
+
+
+@dataclass(frozen=True)
+class WatchTarget:
+    source: str
+    directory: str
+    pattern: str
+    ingest: IngestFn
+
+    def matches(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(
+            self.directory
+        ) and fnmatch.fnmatch(os.path.basename(path), self.pattern)
+
+
+@dataclass
+class Metrics:
+    started: float = field(default_factory=time.time)
+    counters: dict[tuple[str, str], int] = field(default_factory=dict)
+    seconds: dict[str, float] = field(default_factory=dict)
+    last_success: dict[str, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def inc(self, name: str, source: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[(name, source)] = self.counters.get((name, source), 0) + n
+
+    def observe(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[source] = self.seconds.get(source, 0.0) + seconds
+            self.last_success[source] = time.time()
+
+    def render(self, gauges: dict[str, int]) -> str:
+        # Prometheus text exposition format
+        with self._lock:
+            lines = [f"ingest_watch_uptime_seconds {time.time() - self.started:.1f}"]
+            for (name, source), v in sorted(self.counters.items()):
+                lines.append(f'ingest_watch_{name}_total{{source="{source}"}} {v}')
+            for source, v in sorted(self.seconds.items()):
+                lines.append(f'ingest_watch_ingest_seconds_total{{source="{source}"}} {v:.3f}')
+            for source, v in sorted(self.last_success.items()):
+                lines.append(f'ingest_watch_last_success_timestamp{{source="{source}"}} {v:.0f}')
+        lines += [f"ingest_watch_{k} {v}" for k, v in sorted(gauges.items())]
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class LandingWatcher:
+    """
+    Feeds files that land in the watched directories to the per-file ingestors.
+
+    A file is submitted once its size and mtime have been stable for
+    debounce_seconds (so half-copied files are not read), and only once per
+    (size, mtime): the ledger at state_path survives restarts, so a restart
+    does not even re-read files the ingestors would skip as already landed.
+    """
+
+    cfg: AppConfig
+    s3: S3Client
+    targets: list[WatchTarget]
+    state_path: str
+    debounce_seconds: float = 2.0
+    workers: int = 4
+    metrics: Metrics = field(default_factory=Metrics)
+
+    _pending: dict[str, tuple[int, int, float]] = field(default_factory=dict, init=False)
+    _in_flight: dict[str, Future] = field(default_factory=dict, init=False)
+    _done: dict[str, list[int]] = field(default_factory=dict, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+
+    def __post_init__(self) -> None:
+        self.pool = ThreadPoolExecutor(max_workers=max(1, self.workers))
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                self._done = json.load(f)
+
+    def _target(self, path: str) -> WatchTarget | None:
+        return next((t for t in self.targets if t.matches(path)), None)
+
+    def notify(self, path: str) -> None:
+        if self._target(path) is None:
+            return
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        sig = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if self._done.get(path) == list(sig) or path in self._in_flight:
+                return
+            prev = self._pending.get(path)
+            if prev is None or prev[:2] != sig:
+                # New or still growing: restart the quiet period
+                self._pending[path] = (*sig, time.monotonic())
+
+    def scan(self) -> None:
+        for t in self.targets:
+            for path in glob.glob(os.path.join(t.directory, t.pattern)):
+                self.notify(path)
+
+    def tick(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            ready = [
+                p
+                for p, (_, _, seen) in self._pending.items()
+                if now - seen >= self.debounce_seconds
+            ]
+        for path in ready:
+            # Re-check: anything written since the last notify restarts the debounce
+            self.notify(path)
+            with self._lock:
+                entry = self._pending.get(path)
+                if entry is None or now - entry[2] < self.debounce_seconds:
+                    continue
+                del self._pending[path]
+                self._in_flight[path] = self.pool.submit(self._ingest, path, entry[:2])
+
+    def _ingest(self, path: str, sig: tuple[int, int]) -> None:
+        target = self._target(path)
+        started = time.perf_counter()
+        try:
+            manifests = target.ingest(self.cfg, self.s3, path)
+        except Exception as e:
+            self.metrics.inc("files_failed", target.source)
+            log_exc("watch_ingest_failed", e, file=path, source=target.source)
+            # Leave it out of the ledger; the next change or rescan retries it
+            return
+        finally:
+            with self._lock:
+                self._in_flight.pop(path, None)
+
+        elapsed = time.perf_counter() - started
+        self.metrics.inc("files_ingested", target.source)
+        self.metrics.inc("manifests_written", target.source, len(manifests))
+        self.metrics.observe(target.source, elapsed)
+        with self._lock:
+            self._done[path] = list(sig)
+            self._save_ledger()
+        log("watch_ingested", file=path, source=target.source, manifests=len(manifests))
+
+    def _save_ledger(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._done, f)
+        os.replace(tmp, self.state_path)
+
+    def gauges(self) -> dict[str, int]:
+        with self._lock:
+            return {"pending_files": len(self._pending), "in_flight_files": len(self._in_flight)}
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+def start_inotify(watcher: LandingWatcher):
+    """
+    Start a watchdog observer (inotify on Linux) over the target directories.
+    Returns None when watchdog is unavailable; the caller then relies on polling.
+    """
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event) -> None:
+            if not event.is_directory:
+                watcher.notify(getattr(event, "dest_path", "") or event.src_path)
+
+    observer = Observer()
+    for t in watcher.targets:
+        os.makedirs(t.directory, exist_ok=True)
+        observer.schedule(_Handler(), t.directory, recursive=False)
+    observer.daemon = True
+    observer.start()
+    return observer
+
+
+def serve_http(watcher: LandingWatcher, port: int) -> ThreadingHTTPServer:
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                body = json.dumps({"status": "ok", **watcher.gauges()}).encode("utf-8")
+                ctype = "application/json"
+            elif self.path == "/metrics":
+                body = watcher.metrics.render(watcher.gauges()).encode("utf-8")
+                ctype = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    # The scheduled flow can own the landing directories instead (LANDING_INGESTER=flow);
+    # ingesting them from both would write every file to RAW twice
+    if os.getenv("LANDING_INGESTER", "watch") != "watch":
+        log("watch_disabled", landing_ingester=os.getenv("LANDING_INGESTER"))
+        return
+
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+
+    targets = [
+        WatchTarget(
+            source="events",
+            directory=os.getenv("WATCH_EVENTS_DIR", "/data/events"),
+            pattern=os.getenv("WATCH_EVENTS_PATTERN", "*.jsonl"),
+            ingest=ingest_events_from_file.ingest_file,
+        ),
+        WatchTarget(
+            source="inventory",
+            directory=os.getenv("WATCH_INVENTORY_DIR", "/data/inventory"),
+            pattern=os.getenv("WATCH_INVENTORY_PATTERN", "inventory_snapshot_*.csv"),
+            ingest=ingest_inventory_csv.ingest_file,
+        ),
+    ]
+    watcher = LandingWatcher(
+        cfg=cfg,
+        s3=s3,
+        targets=targets,
+        state_path=os.getenv("WATCH_STATE_PATH", "/data/catalog/watch_state.json"),
+        debounce_seconds=float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2")),
+        workers=int(os.getenv("WATCH_WORKERS", "4")),
+    )
+
+    observer = start_inotify(watcher)
+    # With inotify the rescan only catches missed events; without it, it is the watcher
+    rescan_seconds = float(os.getenv("WATCH_RESCAN_SECONDS", "60" if observer else "1"))
+    server = serve_http(watcher, int(os.getenv("WATCH_HTTP_PORT", "8080")))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    log(
+        "watch_started",
+        targets=[t.directory for t in targets],
+        inotify=observer is not None,
+        rescan_seconds=rescan_seconds,
+    )
+
+    try:
+        next_scan = 0.0
+        while not stop.is_set():
+            if time.monotonic() >= next_scan:
+                watcher.scan()
+                next_scan = time.monotonic() + rescan_seconds
+            watcher.tick()
+            stop.wait(0.25)
+    finally:
+        if observer is not None:
+            observer.stop()
+        server.shutdown()
+        watcher.close()
+        log("watch_stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import threading
+from datetime import UTC, datetime
+
+import pytest
+
+# Entry points import the ingest package as `src`, as they do when run from ingest/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.common import s3 as s3_module  # noqa: E402
+from src.common.config import AppConfig  # noqa: E402
+from src.common.s3 import S3Client  # noqa: E402
+
+
+def client_error(code: str):
+    from botocore.exceptions import ClientError
+
+    return ClientError({"Error": {"Code": code}}, "FakeOperation")
+
+
+class _Body:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+
+class FakeBoto:
+    """
+    In-memory stand-in for the boto3 S3 client: the calls S3Client and StateStore
+    make, including conditional puts/gets and list_objects_v2 pagination.
+    """
+
+    def __init__(self, page_size: int = 1000) -> None:
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self.calls: list[tuple[str, dict]] = []
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        # Called with the key just before a put_object is applied (to simulate races)
+        self.before_put = None
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, IfNoneMatch=None):
+        if self.before_put is not None:
+            self.before_put(Key)
+        with self.lock:
+            self.calls.append(("put_object", {"Key": Key}))
+            current = self.objects.get(Key)
+            if IfMatch is not None and (current is None or current[1] != IfMatch):
+                raise client_error("PreconditionFailed")
+            if IfNoneMatch == "*" and current is not None:
+                raise client_error("PreconditionFailed")
+            etag = f'"{hashlib.md5(Body).hexdigest()}-{len(self.calls)}"'
+            self.objects[Key] = (Body, etag)
+            return {"ETag": etag}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        with self.lock:
+            self.calls.append(("get_object", {"Key": Key}))
+            if Key not in self.objects:
+                raise client_error("NoSuchKey")
+            data, etag = self.objects[Key]
+            if IfNoneMatch is not None and IfNoneMatch == etag:
+                raise client_error("304")
+            return {"Body": _Body(data), "ETag": etag}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise client_error("404")
+        return {"ETag": self.objects[Key][1]}
+
+    def get_paginator(self, name: str):
+        assert name == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix, Delimiter=None, StartAfter=""):
+        self.calls.append(
+            ("list", {"Prefix": Prefix, "Delimiter": Delimiter, "StartAfter": StartAfter})
+        )
+        keys = sorted(k for k in self.objects if k.startswith(Prefix) and k > StartAfter)
+        if Delimiter:
+            prefixes = sorted(
+                {
+                    Prefix + k[len(Prefix) :].split(Delimiter)[0] + Delimiter
+                    for k in keys
+                    if Delimiter in k[len(Prefix) :]
+                }
+            )
+            yield {"CommonPrefixes": [{"Prefix": p} for p in prefixes]}
+            return
+        for i in range(0, len(keys), self.page_size):
+            yield {
+                "Contents": [
+                    {
+                        "Key": k,
+                        "ETag": self.objects[k][1],
+                        "LastModified": datetime(2026, 2, 18, 9, 0, tzinfo=UTC),
+                        "Size": len(self.objects[k][0]),
+                    }
+                    for k in keys[i : i + self.page_size]
+                ]
+            }
+
+
+@pytest.fixture
+def boto(monkeypatch) -> FakeBoto:
+    fake = FakeBoto()
+    monkeypatch.setattr(s3_module, "_s3_client", lambda region: fake)
+    return fake
+
+
+@pytest.fixture
+def s3(boto) -> S3Client:
+    return S3Client(bucket="raw", region="eu-west-1")
+
+
+@pytest.fixture
+def cfg() -> AppConfig:
+    return AppConfig(
+        env="test",
+        aws_region="eu-west-1",
+        s3_raw_bucket="raw",
+        pg_host="localhost",
+        pg_port=5432,
+        pg_db="appdb",
+        pg_user="postgres",
+        pg_password="postgres",
+        mailblaze_base_url="http://localhost:8000",
+        mailblaze_api_key="test",
+        state_cache_dir="",
+    )
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import pytest
+
+from src.common.catalog import ManifestCatalog, parse_manifest_key
+
+M = "env=test/raw/_manifests"
+
+
+@pytest.fixture
+def catalog():
+    c = ManifestCatalog(":memory:")
+    yield c
+    c.close()
+
+
+def put_events_manifest(s3, dt: str, run_id: str, rows: int = 1) -> str:
+    key = f"{M}/source=events/dt={dt}/run_id={run_id}.json"
+    part = f"env=test/raw/source=events/dt={dt}/hour=09/run_id={run_id}/part-00000.jsonl"
+    s3.put_json(
+        key,
+        {
+            "run_id": run_id,
+            "rows": rows,
+            "parts": [{"key": part, "dt": dt, "hour": "09", "rows": rows, "bytes": 10}],
+        },
+    )
+    return key
+
+
+def put_postgres_manifest(s3, table: str, dt: str, run_id: str) -> str:
+    key = f"{M}/source=postgres/table={table}/dt={dt}/run_id={run_id}.json"
+    s3.put_json(key, {"data_key": f"env=test/raw/source=postgres/{table}/{run_id}", "bytes": 5})
+    return key
+
+
+def listings(boto) -> list[tuple[str, str]]:
+    return [
+        (c["Prefix"], c["StartAfter"])
+        for op, c in boto.calls
+        if op == "list" and c["Delimiter"] is None
+    ]
+
+
+def test_parse_manifest_key():
+    assert parse_manifest_key(
+        f"{M}/source=postgres/table=orders/dt=2026-02-18/run_id=abc.json"
+    ) == {
+        "source": "postgres",
+        "entity": "orders",
+        "dt": "2026-02-18",
+        "run_id": "abc",
+    }
+    assert parse_manifest_key(f"{M}/source=3pl_inventory/dt=2026-02-18/snap.json")["run_id"] is None
+
+
+def test_sync_indexes_both_manifest_shapes(s3, catalog):
+    events = put_events_manifest(s3, "2026-02-18", "r1", rows=3)
+    orders = put_postgres_manifest(s3, "orders", "2026-02-18", "r2")
+    # Profiles share the prefix but are not manifests
+    s3.put_bytes(
+        f"{M}/_profiles/source=events/dt=2026-02-18/run_id=r1.sample.folded", b"", "text/plain"
+    )
+
+    assert catalog.sync(s3, "test") == 2
+
+    assert [f["data_key"] for f in catalog.files(source="events")] == [
+        "env=test/raw/source=events/dt=2026-02-18/hour=09/run_id=r1/part-00000.jsonl"
+    ]
+    found = catalog.find_key("env=test/raw/source=postgres/orders/r2")
+    assert found["manifest_key"] == orders
+    assert found["entity"] == "orders"
+    assert {r["run_id"] for r in catalog.runs()} == {"r1", "r2"}
+    assert [m["manifest_key"] for m in catalog.manifests_since("2026-02-18T00:00:00Z")] == sorted(
+        [events, orders]
+    )
+    assert catalog.files_for_manifests([events])[0]["rows"] == 3
+
+
+def test_sync_only_fetches_new_or_rewritten_manifests(s3, boto, catalog):
+    key = put_events_manifest(s3, "2026-02-18", "r1")
+    assert catalog.sync(s3, "test") == 1
+    assert catalog.sync(s3, "test") == 0
+
+    put_events_manifest(s3, "2026-02-18", "r1", rows=7)
+    assert catalog.sync(s3, "test") == 1
+    assert catalog.files_for_manifests([key])[0]["rows"] == 7
+
+
+def test_incremental_sync_lists_from_the_lookback_window(s3, boto, catalog, monkeypatch):
+    monkeypatch.setenv("CATALOG_SYNC_LOOKBACK_DAYS", "2")
+    put_events_manifest(s3, "2026-01-01", "old")
+    put_events_manifest(s3, "2026-02-18", "r1")
+    put_postgres_manifest(s3, "orders", "2026-02-10", "r2")
+    catalog.sync(s3, "test")
+    assert listings(boto) == [
+        (f"{M}/source=events/", ""),
+        (f"{M}/source=postgres/table=orders/", ""),
+    ]
+
+    boto.calls.clear()
+    put_events_manifest(s3, "2026-02-17", "late")
+    put_events_manifest(s3, "2026-01-02", "backfill")
+    assert catalog.sync(s3, "test") == 1
+    assert listings(boto) == [
+        (f"{M}/source=events/", f"{M}/source=events/dt=2026-02-16"),
+        (f"{M}/source=postgres/table=orders/", f"{M}/source=postgres/table=orders/dt=2026-02-08"),
+    ]
+
+    # Partitions older than the window need a full listing
+    assert catalog.sync(s3, "test", source="events", full=True) == 1
+    assert {r["run_id"] for r in catalog.runs(source="events")} == {"old", "r1", "late", "backfill"}
+
+
+def test_watermark_partition_is_relisted_for_random_run_ids(s3, catalog):
+    put_events_manifest(s3, "2026-02-18", "ffff")
+    catalog.sync(s3, "test")
+    # Sorts before the last key listed, in the same partition
+    put_events_manifest(s3, "2026-02-18", "0000")
+    assert catalog.sync(s3, "test") == 1
+
+
+def test_stale_full_sync_finds_backfilled_partitions(s3, boto, catalog, monkeypatch):
+    monkeypatch.setenv("CATALOG_SYNC_LOOKBACK_DAYS", "2")
+    put_events_manifest(s3, "2026-02-18", "r1")
+    catalog.sync(s3, "test")
+    put_events_manifest(s3, "2026-01-02", "backfill")
+
+    # Within CATALOG_FULL_SYNC_HOURS of the first (full) sync: incremental only
+    assert catalog.sync(s3, "test") == 0
+
+    monkeypatch.setenv("CATALOG_FULL_SYNC_HOURS", "0")
+    boto.calls.clear()
+    assert catalog.sync(s3, "test") == 1
+    assert listings(boto) == [(f"{M}/source=events/", "")]
+    assert {r["run_id"] for r in catalog.runs()} == {"r1", "backfill"}
+
+
+def test_unprocessed_tracks_keys_not_timestamps(s3, boto, catalog):
+    first = put_events_manifest(s3, "2026-02-18", "r1")
+    catalog.sync(s3, "test")
+    pending = catalog.unprocessed("flow")
+    assert [m["manifest_key"] for m in pending] == [first]
+    catalog.mark_processed("flow", pending)
+    assert catalog.unprocessed("flow") == []
+
+    # Same LastModified as the processed one (an in-flight PUT listed late) and a rewrite
+    late = put_events_manifest(s3, "2026-02-17", "r0")
+    put_events_manifest(s3, "2026-02-18", "r1", rows=5)
+    catalog.sync(s3, "test")
+    assert [m["manifest_key"] for m in catalog.unprocessed("flow")] == [late, first]
+    assert [m["manifest_key"] for m in catalog.unprocessed("other")] == [late, first]
+
+
+def test_mark_processed_before_seeds_a_rebuilt_catalog(s3, catalog):
+    put_events_manifest(s3, "2026-02-18", "r1")
+    catalog.sync(s3, "test")
+    assert not catalog.has_processed("flow")
+
+    # FakeBoto stamps every object 2026-02-18T09:00:00Z
+    assert catalog.mark_processed_before("flow", "2026-02-18T09:00:00Z") == 0
+    assert catalog.mark_processed_before("flow", "2026-02-18T09:00:01Z") == 1
+    assert catalog.has_processed("flow")
+    assert catalog.unprocessed("flow") == []
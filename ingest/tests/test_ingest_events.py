@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+
+import orjson
+
+from src import ingest_events_from_file
+
+
+def line(i: int, ts: str) -> bytes:
+    return orjson.dumps(
+        {"event_id": f"e{i}", "event_type": "page_view", "event_ts": ts, "idempotency_key": f"k{i}"}
+    )
+
+
+def manifests_by_key(boto, keys: list[str]) -> dict[str, dict]:
+    return {k: json.loads(boto.objects[k][0]) for k in keys}
+
+
+def test_ingest_file_repartitions_by_event_time_and_quarantines(cfg, s3, boto, tmp_path):
+    fp = tmp_path / "events_2026-02-18T090000Z.jsonl"
+    fp.write_bytes(
+        b"\n".join(
+            [
+                line(1, "2026-02-17T23:59:59Z"),
+                b"{broken",
+                line(2, "2026-02-18T00:00:00Z"),
+                b"",
+                line(3, "2026-02-18T13:00:00Z"),
+            ]
+        )
+    )
+
+    keys = ingest_events_from_file.ingest_file(cfg, s3, str(fp))
+
+    manifests = manifests_by_key(boto, keys)
+    assert sorted(m["profile"]["min_event_ts"][:10] for m in manifests.values()) == [
+        "2026-02-17",
+        "2026-02-18",
+    ]
+    for m in manifests.values():
+        assert m["file_bad_rows"] == 1
+        assert m["rows"] == sum(p["rows"] for p in m["parts"])
+        for p in m["parts"]:
+            assert p["key"] in boto.objects
+            assert f"/dt={p['dt']}/hour={p['hour']}/" in p["key"]
+        [q] = m["quarantine_parts"]
+        assert "/_quarantine/source=events/dt=2026-02-18/" in q["key"]
+        assert json.loads(boto.objects[q["key"]][0])["line_no"] == 2
+
+
+def test_run_pipelines_files_and_rolls_quarantine_over(cfg, s3, boto, tmp_path, monkeypatch):
+    monkeypatch.setenv("EVENTS_PART_MAX_BYTES", "300")
+    monkeypatch.setenv("EVENTS_UPLOAD_WORKERS", "2")
+    monkeypatch.setenv("EVENTS_UPLOADS_IN_FLIGHT", "1")
+    for n in range(3):
+        lines = [line(n * 100 + i, f"2026-02-1{n}T0{i % 3}:00:00Z") for i in range(20)]
+        lines += [b'{"event_id": 1}'] * 10
+        (tmp_path / f"events_2026-02-1{n}T000000Z.jsonl").write_bytes(b"\n".join(lines) + b"\n")
+
+    keys = ingest_events_from_file.run(cfg, s3, str(tmp_path / "*.jsonl"), run_id="batch")
+
+    manifests = manifests_by_key(boto, keys)
+    assert len(manifests) == 3
+    assert sum(m["rows"] for m in manifests.values()) == 60
+    for m in manifests.values():
+        assert all(p["key"] in boto.objects for p in m["parts"])
+        # 10 quarantined lines of ~100 bytes roll over at 300 bytes
+        quarantine = m["quarantine_parts"]
+        assert len(quarantine) > 1
+        assert sum(q["rows"] for q in quarantine) == 10
+        assert all(q["bytes"] <= 300 + 120 for q in quarantine)
+
+
+def test_run_without_files_returns_nothing(cfg, s3, tmp_path):
+    assert ingest_events_from_file.run(cfg, s3, str(tmp_path / "*.jsonl")) == []
+
+
+def test_file_without_valid_lines_still_gets_a_manifest(cfg, s3, boto, tmp_path):
+    fp = tmp_path / "events_2026-02-18T090000Z.jsonl"
+    fp.write_bytes(b'{"event_id": 1}\nnot json\n')
+
+    [key] = ingest_events_from_file.ingest_file(cfg, s3, str(fp))
+
+    assert "/_manifests/source=events/dt=2026-02-18/" in key
+    m = json.loads(boto.objects[key][0])
+    assert m["parts"] == [] and m["rows"] == 0
+    assert m["file_bad_rows"] == 2
+    assert sum(q["rows"] for q in m["quarantine_parts"]) == 2
+
+
+def test_rerun_only_ingests_new_files(cfg, s3, boto, tmp_path):
+    (tmp_path / "events_2026-02-18T090000Z.jsonl").write_bytes(line(1, "2026-02-18T09:00:00Z"))
+    first = ingest_events_from_file.run(cfg, s3, str(tmp_path / "*.jsonl"))
+    objects = dict(boto.objects)
+
+    assert ingest_events_from_file.run(cfg, s3, str(tmp_path / "*.jsonl")) == []
+    assert (
+        ingest_events_from_file.ingest_file(
+            cfg, s3, str(tmp_path / "events_2026-02-18T090000Z.jsonl")
+        )
+        == []
+    )
+    assert boto.objects == objects
+
+    (tmp_path / "events_2026-02-19T090000Z.jsonl").write_bytes(line(2, "2026-02-19T09:00:00Z"))
+    second = ingest_events_from_file.run(cfg, s3, str(tmp_path / "*.jsonl"))
+    assert len(second) == 1 and set(second).isdisjoint(first)
+
+
+def test_run_id_follows_file_identity(tmp_path):
+    fp = tmp_path / "events_2026-02-18T090000Z.jsonl"
+    fp.write_bytes(b"{}\n")
+    run_id = ingest_events_from_file.file_run_id(str(fp))
+    assert run_id == ingest_events_from_file.file_run_id(str(fp))
+
+    fp.write_bytes(b"{}\n{}\n")
+    assert ingest_events_from_file.file_run_id(str(fp)) != run_id
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from src import ingest_inventory_csv
+
+
+def test_landed_snapshots_are_skipped_without_reading(cfg, s3, boto, tmp_path, monkeypatch):
+    fp = tmp_path / "inventory_snapshot_WH_EU_01_2026-02-18.csv"
+    fp.write_text("snapshot_date,warehouse_id,sku,on_hand_qty\n2026-02-18,WH_EU_01,A,3\n")
+
+    [key] = ingest_inventory_csv.run(cfg, s3, str(tmp_path))
+    assert key.endswith("/dt=2026-02-18/inventory_snapshot_WH_EU_01.json")
+
+    def no_read(self):
+        raise AssertionError("landed snapshot was read again")
+
+    monkeypatch.setattr(ingest_inventory_csv.Path, "read_bytes", no_read)
+    assert ingest_inventory_csv.run(cfg, s3, str(tmp_path)) == []
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from src.common import s3 as s3_module
+from src.common.partition import PartitionedWriter, Uploader
+
+DT1 = (("dt", "2026-02-18"), ("hour", "09"))
+DT2 = (("dt", "2026-02-19"), ("hour", "00"))
+
+
+def writer(s3, **kwargs) -> PartitionedWriter:
+    return PartitionedWriter(s3=s3, prefix="env=test/raw/source=events", run_id="r1", **kwargs)
+
+
+def test_partition_rolls_over_at_part_max_bytes(s3, boto):
+    w = writer(s3, part_max_bytes=20)
+    for i in range(5):
+        w.write(DT1, f"line-{i:04d}\n".encode())  # 10 bytes each
+
+    parts = w.close()
+
+    assert [p.key for p in parts] == [
+        "env=test/raw/source=events/dt=2026-02-18/hour=09/run_id=r1/part-00000.jsonl",
+        "env=test/raw/source=events/dt=2026-02-18/hour=09/run_id=r1/part-00001.jsonl",
+        "env=test/raw/source=events/dt=2026-02-18/hour=09/run_id=r1/part-00002.jsonl",
+    ]
+    assert [p.rows for p in parts] == [2, 2, 1]
+    data = b"".join(boto.objects[p.key][0] for p in parts)
+    assert data == b"".join(f"line-{i:04d}\n".encode() for i in range(5))
+    for p in parts:
+        body = boto.objects[p.key][0]
+        assert p.bytes == len(body)
+        assert p.sha256 == hashlib.sha256(body).hexdigest()
+
+
+def test_largest_buffer_is_flushed_when_total_exceeds_buffer_max(s3, boto):
+    w = writer(s3, part_max_bytes=1000, buffer_max_bytes=25)
+    w.write(DT1, b"a" * 10)
+    w.write(DT1, b"a" * 10)
+    w.write(DT2, b"b" * 10)  # 30 buffered > 25: DT1 (20 bytes) goes first
+
+    assert [(p.partition, p.rows) for p in w.parts] == [(DT1, 2)]
+
+    parts = w.close()
+    assert [(p.partition, p.rows) for p in parts] == [(DT1, 2), (DT2, 1)]
+    assert parts[1].to_dict()["dt"] == "2026-02-19"
+
+
+def test_close_without_writes_uploads_nothing(s3, boto):
+    assert writer(s3).close() == []
+    assert boto.objects == {}
+
+
+def test_uploader_parts_are_all_uploaded_by_close(s3, boto):
+    uploader = Uploader(s3, workers=2, max_in_flight=1)
+    w = writer(s3, part_max_bytes=10, uploader=uploader)
+    for i in range(6):
+        w.write(DT1 if i % 2 else DT2, f"row-{i:05d}\n".encode())
+
+    parts = w.close()
+    uploader.close()
+
+    assert len(parts) == 6
+    assert all(p.key in boto.objects for p in parts)
+
+
+def test_uploader_errors_surface_on_close(s3, boto, monkeypatch):
+    def fail(key):
+        raise OSError("network down")
+
+    # No tenacity backoff: the first failure is final
+    monkeypatch.setattr(s3_module, "with_retry", lambda fn: fn())
+    boto.before_put = fail
+    uploader = Uploader(s3, workers=1)
+    w = writer(s3, part_max_bytes=1, uploader=uploader)
+    try:
+        w.write(DT1, b"x\n")
+        with pytest.raises(OSError, match="network down"):
+            w.close()
+    finally:
+        uploader.close()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.common import pg_diff
+from src.common.pg_diff import diff_rows, extract_table_diff, read_snapshot
+
+
+def cur(*rows: tuple[str, str]) -> list[tuple[str, str, str]]:
+    return [(k, h, f'{{"k": {k}, "h": "{h}"}}') for k, h in rows]
+
+
+def ops(current, previous) -> list[tuple[str, str]]:
+    return [(op, key) for op, key, _ in diff_rows(current, previous)]
+
+
+@pytest.mark.parametrize(
+    ("current", "previous", "expected"),
+    [
+        # Inserts before, between and after the previous keys
+        (
+            [("[1]", "a"), ("[2]", "b"), ("[3]", "c"), ("[4]", "d")],
+            [("[2]", "b"), ("[3]", "c")],
+            [("I", "[1]"), ("I", "[4]")],
+        ),
+        (
+            [("[1]", "a"), ("[2]", "b"), ("[3]", "c")],
+            [("[1]", "a"), ("[3]", "c")],
+            [("I", "[2]")],
+        ),
+        # Deletes at the head and the tail of the previous stream
+        ([("[2]", "b")], [("[1]", "a"), ("[2]", "b"), ("[3]", "c")], [("D", "[1]"), ("D", "[3]")]),
+        # Updates at both edges
+        (
+            [("[1]", "A"), ("[2]", "b"), ("[3]", "C")],
+            [("[1]", "a"), ("[2]", "b"), ("[3]", "c")],
+            [("U", "[1]"), ("U", "[3]")],
+        ),
+        # Mixed, with a delete running past the last current key
+        (
+            [("[1]", "a"), ("[3]", "X")],
+            [("[1]", "a"), ("[2]", "b"), ("[3]", "c"), ("[4]", "d")],
+            [("D", "[2]"), ("U", "[3]"), ("D", "[4]")],
+        ),
+        ([("[1]", "a")], [], [("I", "[1]")]),
+        ([], [("[1]", "a")], [("D", "[1]")]),
+        ([], [], []),
+    ],
+)
+def test_diff_rows(current, previous, expected):
+    assert ops(cur(*current), previous) == expected
+
+
+def test_diff_rows_carries_row_json_except_for_deletes():
+    out = list(diff_rows(cur(("[1]", "a")), [("[0]", "z"), ("[1]", "b")]))
+    assert out == [("D", "[0]", None), ("U", "[1]", '{"k": [1], "h": "a"}')]
+
+
+def test_extract_table_diff_baseline_then_changes(s3, boto, monkeypatch):
+    table_rows = [
+        ("[1]", "h1", '{"id": 1, "v": "a"}'),
+        ("[2]", "h2", '{"id": 2, "v": "b"}'),
+    ]
+    monkeypatch.setattr(pg_diff, "primary_key", lambda conn, table: ["id"])
+    monkeypatch.setattr(pg_diff, "hashed_rows", lambda conn, table, pk: iter(table_rows))
+
+    first = extract_table_diff(None, s3, "test", "orders", "r1", "2026-02-18")
+    snapshot_key = "env=test/raw/_state/row_hashes/orders.tsv.gz"
+    assert list(read_snapshot(boto.objects[snapshot_key][0])) == [("[1]", "h1"), ("[2]", "h2")]
+    assert json.loads(boto.objects[first][0])["ops"] == {"I": 2}
+
+    table_rows[:] = [("[2]", "h2b", '{"id": 2, "v": "B"}'), ("[3]", "h3", '{"id": 3, "v": "c"}')]
+    second = extract_table_diff(None, s3, "test", "orders", "r2", "2026-02-19")
+    manifest = json.loads(boto.objects[second][0])
+    assert manifest["ops"] == {"D": 1, "U": 1, "I": 1}
+    changes = [json.loads(line) for line in boto.objects[manifest["data_key"]][0].splitlines()]
+    assert changes == [
+        {"op": "D", "key": {"id": 1}, "row": None},
+        {"op": "U", "key": {"id": 2}, "row": {"id": 2, "v": "B"}},
+        {"op": "I", "key": {"id": 3}, "row": {"id": 3, "v": "c"}},
+    ]
+
+    # Nothing changed: no manifest, snapshot left as is
+    assert extract_table_diff(None, s3, "test", "orders", "r3", "2026-02-19") is None
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.common.state import StateConflict, StateStore, max_merge
+
+KEY = "env=test/raw/_state/wm.json"
+
+
+def store(s3, **kwargs) -> StateStore:
+    return StateStore(s3=s3, env="test", **kwargs)
+
+
+def stored(boto) -> dict:
+    return json.loads(boto.objects[KEY][0])
+
+
+def race_once(boto, other: StateStore, value: dict):
+    """
+    Make another writer land `value` right before our next put.
+    """
+
+    def _race(key):
+        boto.before_put = None
+        other.put("wm", value)
+
+    return _race
+
+
+def test_update_creates_missing_state(s3, boto):
+    assert store(s3).update("wm", lambda cur: {**cur, "a": "1"}) == {"a": "1"}
+    assert stored(boto) == {"a": "1"}
+
+
+def test_update_retries_on_conflict_and_reapplies_fn(s3, boto):
+    mine, other = store(s3), store(s3)
+    mine.put("wm", {"a": "2026-02-18T00:00:00Z"})
+    other.get("wm")
+
+    boto.before_put = race_once(boto, other, {"a": "2026-02-18T00:00:00Z", "b": "x"})
+    calls = []
+
+    def fn(cur):
+        calls.append(dict(cur))
+        return max_merge(cur, {"a": "2026-02-19T00:00:00Z"})
+
+    result = mine.update("wm", fn)
+
+    # First attempt saw the cached value, the retry the other writer's
+    assert calls == [
+        {"a": "2026-02-18T00:00:00Z"},
+        {"a": "2026-02-18T00:00:00Z", "b": "x"},
+    ]
+    assert result == stored(boto) == {"a": "2026-02-19T00:00:00Z", "b": "x"}
+
+
+def test_put_after_read_conflicts_when_state_changed(s3, boto):
+    mine, other = store(s3), store(s3)
+    mine.put("wm", {"a": "1"})
+    other.get("wm")
+    mine.put("wm", {"a": "2"})
+
+    with pytest.raises(StateConflict):
+        other.put("wm", {"a": "3"})
+    assert stored(boto) == {"a": "2"}
+
+
+def test_put_on_absent_state_conflicts_with_concurrent_create(s3, boto):
+    mine, other = store(s3), store(s3)
+    assert mine.get("wm") is None
+    other.put("wm", {"a": "1"})
+
+    with pytest.raises(StateConflict):
+        mine.put("wm", {"a": "2"})
+
+
+def test_update_gives_up_after_retries(s3, boto):
+    mine, other = store(s3), store(s3)
+    mine.put("wm", {"n": 0})
+
+    def _always_race(key):
+        boto.before_put = None
+        other.get("wm", refresh=True)
+        other.put("wm", {"n": -1})
+        boto.before_put = _always_race
+
+    boto.before_put = _always_race
+    with pytest.raises(StateConflict, match="lost 3 races"):
+        mine.update("wm", lambda cur: {"n": cur["n"] + 1}, retries=3)
+    boto.before_put = None
+
+
+def test_disk_cache_revalidates_with_conditional_get(s3, boto, tmp_path):
+    store(s3, cache_dir=str(tmp_path)).put("wm", {"a": "1"})
+
+    # A fresh process holding the disk copy sends its ETag and gets a 304
+    _, etag = boto.objects[KEY]
+    boto.objects[KEY] = (b"{}", etag)
+    fresh = store(s3, cache_dir=str(tmp_path))
+    assert fresh.get("wm") == {"a": "1"}
+
+
+def test_max_merge_keeps_larger_watermarks():
+    cur = {"a": "2026-02-18T00:00:00Z", "b": "2026-02-18T00:00:00Z"}
+    upd = {"a": "2026-02-17T00:00:00Z", "b": "2026-02-19T00:00:00Z", "c": None}
+    assert max_merge(cur, upd) == {"a": "2026-02-18T00:00:00Z", "b": "2026-02-19T00:00:00Z"}
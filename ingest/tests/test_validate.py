@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import orjson
+import pytest
+
+from src.common.validate import EventProfile, InvalidEvent, quarantine_record, validate_event
+
+
+def event(**overrides) -> bytes:
+    obj = {
+        "event_id": "e1",
+        "event_type": "page_view",
+        "event_ts": "2026-02-18T09:00:00Z",
+        "customer_id": 42,
+        "quantity": 1,
+    }
+    obj.update(overrides)
+    return orjson.dumps({k: v for k, v in obj.items() if v is not ...})
+
+
+def test_valid_event_is_returned_parsed():
+    obj = validate_event(event(customer_id="c-42"))
+    assert obj["event_id"] == "e1"
+    assert obj["customer_id"] == "c-42"
+
+
+def test_optional_fields_may_be_null_or_absent():
+    validate_event(event(quantity=None, customer_id=...))
+
+
+@pytest.mark.parametrize(
+    ("line", "error"),
+    [
+        (b"{not json", "invalid JSON"),
+        (b"[1, 2]", "not a JSON object"),
+        (event(event_id=...), "missing required field: event_id"),
+        (event(event_type=None), "missing required field: event_type"),
+        (event(event_id=7), "event_id has type int"),
+        (event(quantity="1"), "quantity has type str"),
+        # bool is an int subclass but never a valid integer field
+        (event(quantity=True), "quantity has type bool"),
+        (event(event_ts="2026-02-18T09:00:00+00:00"), "ending with Z"),
+        (event(event_ts="yesterdayZ"), "not ISO8601"),
+    ],
+)
+def test_invalid_events_are_rejected(line, error):
+    with pytest.raises(InvalidEvent, match=error):
+        validate_event(line)
+
+
+def test_profile_tracks_rows_range_and_nulls():
+    profile = EventProfile()
+    for ts, sku in (("2026-02-18T10:00:00Z", "A"), ("2026-02-18T08:00:00Z", None)):
+        profile.add(validate_event(event(event_ts=ts, sku=sku)))
+
+    out = profile.to_dict()
+    assert out["rows"] == 2
+    assert out["min_event_ts"] == "2026-02-18T08:00:00Z"
+    assert out["max_event_ts"] == "2026-02-18T10:00:00Z"
+    assert out["null_counts"]["sku"] == 1
+    assert "event_id" not in out["null_counts"]
+
+
+def test_quarantine_record_keeps_line_and_error():
+    rec = orjson.loads(quarantine_record(3, b"\xffbad", "invalid JSON"))
+    assert rec == {"line_no": 3, "error": "invalid JSON", "raw": "�bad"}
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+
+import pytest
+
+from src.watch_landing import LandingWatcher, WatchTarget
+
+DEBOUNCE = 0.2
+
+
+class Recorder:
+    def __init__(self, fail: bool = False) -> None:
+        self.calls: list[str] = []
+        self.fail = fail
+
+    def __call__(self, cfg, s3, path: str) -> list[str]:
+        self.calls.append(os.path.basename(path))
+        if self.fail:
+            raise OSError("upload failed")
+        return [f"manifest-for-{os.path.basename(path)}"]
+
+
+@pytest.fixture
+def landing(tmp_path):
+    d = tmp_path / "events"
+    d.mkdir()
+    return d
+
+
+def watcher(cfg, landing, ingest, state_path) -> LandingWatcher:
+    target = WatchTarget(source="events", directory=str(landing), pattern="*.jsonl", ingest=ingest)
+    return LandingWatcher(
+        cfg=cfg,
+        s3=None,
+        targets=[target],
+        state_path=str(state_path),
+        debounce_seconds=DEBOUNCE,
+        workers=1,
+    )
+
+
+def settle(w: LandingWatcher) -> None:
+    # Wait past the debounce, submit, and let the worker finish
+    time.sleep(DEBOUNCE * 1.5)
+    w.tick()
+    deadline = time.monotonic() + 5
+    while w.gauges()["in_flight_files"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_target_matches_only_its_directory_and_pattern(landing, tmp_path):
+    t = WatchTarget(source="events", directory=str(landing), pattern="*.jsonl", ingest=Recorder())
+    assert t.matches(str(landing / "a.jsonl"))
+    assert not t.matches(str(landing / "a.csv"))
+    assert not t.matches(str(tmp_path / "a.jsonl"))
+
+
+def test_file_is_ingested_once_after_the_quiet_period(cfg, landing, tmp_path):
+    ingest = Recorder()
+    w = watcher(cfg, landing, ingest, tmp_path / "ledger.json")
+    f = landing / "a.jsonl"
+    f.write_text("{}\n")
+
+    w.scan()
+    w.tick()
+    assert ingest.calls == []
+    assert w.gauges()["pending_files"] == 1
+
+    settle(w)
+    w.scan()
+    settle(w)
+    w.close()
+
+    assert ingest.calls == ["a.jsonl"]
+    st = os.stat(f)
+    assert json.loads((tmp_path / "ledger.json").read_text()) == {
+        str(f): [st.st_size, st.st_mtime_ns]
+    }
+
+
+def test_growing_file_restarts_the_debounce(cfg, landing, tmp_path):
+    ingest = Recorder()
+    w = watcher(cfg, landing, ingest, tmp_path / "ledger.json")
+    f = landing / "a.jsonl"
+    f.write_text("{}\n")
+    w.notify(str(f))
+
+    time.sleep(DEBOUNCE * 0.75)
+    with f.open("a") as out:
+        out.write("{}\n")
+    time.sleep(DEBOUNCE * 0.75)
+    # Quiet since the first notify, but not since the file last changed
+    w.tick()
+    assert w.gauges() == {"pending_files": 1, "in_flight_files": 0}
+
+    settle(w)
+    w.close()
+    assert ingest.calls == ["a.jsonl"]
+
+
+def test_ledger_survives_restart_and_changed_files_are_reingested(cfg, landing, tmp_path):
+    ledger = tmp_path / "ledger.json"
+    ingest = Recorder()
+    (landing / "a.jsonl").write_text("{}\n")
+    w = watcher(cfg, landing, ingest, ledger)
+    w.scan()
+    settle(w)
+    w.close()
+
+    restarted = watcher(cfg, landing, ingest, ledger)
+    restarted.scan()
+    assert restarted.gauges()["pending_files"] == 0
+
+    (landing / "a.jsonl").write_text("{}\n{}\n")
+    (landing / "b.jsonl").write_text("{}\n")
+    restarted.scan()
+    settle(restarted)
+    restarted.close()
+
+    assert sorted(ingest.calls) == ["a.jsonl", "a.jsonl", "b.jsonl"]
+    assert set(json.loads(ledger.read_text())) == {
+        str(landing / "a.jsonl"),
+        str(landing / "b.jsonl"),
+    }
+
+
+def test_failed_ingest_stays_out_of_the_ledger_and_is_retried(cfg, landing, tmp_path):
+    ledger = tmp_path / "ledger.json"
+    failing = Recorder(fail=True)
+    (landing / "a.jsonl").write_text("{}\n")
+    w = watcher(cfg, landing, failing, ledger)
+    w.scan()
+    settle(w)
+
+    assert failing.calls == ["a.jsonl"]
+    assert not ledger.exists()
+    assert w.metrics.counters[("files_failed", "events")] == 1
+
+    failing.fail = False
+    w.scan()
+    settle(w)
+    w.close()
+    assert failing.calls == ["a.jsonl", "a.jsonl"]
+    assert str(landing / "a.jsonl") in json.loads(ledger.read_text())
+    assert 'ingest_watch_files_ingested_total{source="events"} 1' in w.metrics.render(w.gauges())
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Endpoints that never get latency or faults injected
+EXEMPT_PATHS = ("/health", "/metrics")
+
+
+def _float(name: str, default: float = 0.0) -> float:
+    v = os.getenv(name)
+    return default if v is None or v.strip() == "" else float(v)
+
+
+@dataclass(frozen=True)
+class Latency:
+    """
+    MOCK_SAAS_LATENCY, in milliseconds:
+      none | fixed:<ms> | uniform:<lo>,<hi> | normal:<mean>,<sd> | lognormal:<median>,<sigma>
+    lognormal gives the long right tail real APIs have.
+    """
+
+    kind: str = "none"
+    a: float = 0.0
+    b: float = 0.0
+
+    @staticmethod
+    def parse(spec: str) -> Latency:
+        kind, _, args = spec.strip().lower().partition(":")
+        nums = [float(x) for x in args.split(",") if x.strip()]
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(nums) != expected[kind]:
+            raise ValueError(f"Invalid MOCK_SAAS_LATENCY: {spec!r}")
+        return Latency(kind, *nums)
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(max(self.a, 1e-3)), self.b)
+        return 0.0
+
+
+@dataclass(frozen=True)
+class FaultConfig:
+    latency: Latency = field(default_factory=Latency)
+    rate_limit_rps: float = 0.0
+    rate_limit_burst: float = 0.0
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 35.0
+    bandwidth_kbps: float = 0.0
+
+    @staticmethod
+    def load() -> FaultConfig:
+        rps = _float("MOCK_SAAS_RATE_LIMIT_RPS")
+        return FaultConfig(
+            latency=Latency.parse(os.getenv("MOCK_SAAS_LATENCY", "none")),
+            rate_limit_rps=rps,
+            rate_limit_burst=_float("MOCK_SAAS_RATE_LIMIT_BURST", max(rps, 1.0)),
+            error_rate=_float("MOCK_SAAS_ERROR_RATE"),
+            timeout_rate=_float("MOCK_SAAS_TIMEOUT_RATE"),
+            # Longer than the extractor's 30s client timeout, so the client gives up first
+            timeout_seconds=_float("MOCK_SAAS_TIMEOUT_SECONDS", 35.0),
+            bandwidth_kbps=_float("MOCK_SAAS_BANDWIDTH_KBPS"),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "latency": f"{self.latency.kind}:{self.latency.a},{self.latency.b}",
+            "rate_limit_rps": self.rate_limit_rps,
+            "rate_limit_burst": self.rate_limit_burst,
+            "error_rate": self.error_rate,
+            "timeout_rate": self.timeout_rate,
+            "timeout_seconds": self.timeout_seconds,
+            "bandwidth_kbps": self.bandwidth_kbps,
+        }
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take one token. Returns 0 when allowed, otherwise the seconds until a token frees up.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class Metrics:
+    started: float = field(default_factory=time.time)
+    requests: Counter = field(default_factory=Counter)
+    injected: Counter = field(default_factory=Counter)
+    in_flight: int = 0
+    max_in_flight: int = 0
+    bytes_sent: int = 0
+    injected_latency_seconds: float = 0.0
+    recent: deque = field(default_factory=deque)
+
+    def rate(self, window: float = 60.0) -> float:
+        cutoff = time.monotonic() - window
+        while self.recent and self.recent[0] < cutoff:
+            self.recent.popleft()
+        return len(self.recent) / window
+
+    def render(self, cfg: FaultConfig) -> str:
+        # Prometheus text exposition format
+        lines = [
+            f"mock_saas_uptime_seconds {time.time() - self.started:.1f}",
+            f"mock_saas_requests_per_second_1m {self.rate():.3f}",
+            f"mock_saas_in_flight_requests {self.in_flight}",
+            f"mock_saas_max_in_flight_requests {self.max_in_flight}",
+            f"mock_saas_response_bytes_total {self.bytes_sent}",
+            f"mock_saas_injected_latency_seconds_total {self.injected_latency_seconds:.3f}",
+        ]
+        for (path, status), n in sorted(self.requests.items()):
+            lines.append(f'mock_saas_requests_total{{path="{path}",status="{status}"}} {n}')
+        for kind, n in sorted(self.injected.items()):
+            lines.append(f'mock_saas_injected_faults_total{{kind="{kind}"}} {n}')
+        lines += [f'mock_saas_fault_config{{{k}="{v}"}} 1' for k, v in cfg.as_dict().items()]
+        return "\n".join(lines) + "\n"
+
+
+class FaultInjector:
+    """
+    Decides, per request, the injected latency and whether it is rate limited,
+    fails with a 5xx or times out, and throttles the response body.
+
+    Random draws come from a generator seeded with (MOCK_SAAS_SEED, request key,
+    attempt), where the key is method + path + sorted query string and attempt
+    counts earlier requests with the same key. Replaying a run against a fresh
+    process therefore hits the same faults on the same pages, and a retry of a
+    failed page gets a new, equally reproducible draw. The rate limit is a token
+    bucket over wall-clock time, so it depends on how fast the client calls.
+    """
+
+    def __init__(self, seed: str, cfg: FaultConfig) -> None:
+        self.seed = seed
+        self.cfg = cfg
+        self.metrics = Metrics()
+        self.attempts: Counter = Counter()
+        self.bucket = TokenBucket(cfg.rate_limit_rps, cfg.rate_limit_burst)
+
+    def _rng(self, request: Request) -> random.Random:
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        key = f"{request.method} {request.url.path}?{query}"
+        attempt = self.attempts[key]
+        self.attempts[key] += 1
+        digest = hashlib.sha256(f"{self.seed}::{key}::{attempt}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    async def _throttled(self, body: bytes):
+        chunk = 16 * 1024
+        delay = chunk / (self.cfg.bandwidth_kbps * 1024)
+        for i in range(0, len(body), chunk):
+            if i:
+                await asyncio.sleep(delay)
+            yield body[i : i + chunk]
+
+    async def _handle(self, request: Request, call_next) -> Response:
+        cfg = self.cfg
+        rng = self._rng(request)
+        # Fixed draw order keeps each decision stable when other knobs change
+        u_error, u_timeout, u_status = rng.random(), rng.random(), rng.random()
+        latency = cfg.latency.sample_ms(rng) / 1000
+
+        if cfg.rate_limit_rps > 0:
+            wait = self.bucket.take()
+            if wait > 0:
+                self.metrics.injected["rate_limited"] += 1
+                return JSONResponse(
+                    {"detail": "Rate limit exceeded"},
+                    status_code=429,
+                    headers={
+                        "Retry-After": str(max(1, math.ceil(wait))),
+                        "X-RateLimit-Limit": str(cfg.rate_limit_rps),
+                    },
+                )
+
+        if latency > 0:
+            self.metrics.injected_latency_seconds += latency
+            await asyncio.sleep(latency)
+
+        if u_timeout < cfg.timeout_rate:
+            self.metrics.injected["timeout"] += 1
+            await asyncio.sleep(cfg.timeout_seconds)
+            return JSONResponse({"detail": "Upstream timeout"}, status_code=504)
+
+        if u_error < cfg.error_rate:
+            self.metrics.injected["server_error"] += 1
+            status = (500, 502, 503)[int(u_status * 3)]
+            return JSONResponse({"detail": "Injected server error"}, status_code=status)
+
+        response = await call_next(request)
+        if cfg.bandwidth_kbps <= 0:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        self.metrics.bytes_sent += len(body)
+        headers = dict(response.headers)
+        headers.pop("content-length", None)
+        return StreamingResponse(
+            self._throttled(body),
+            status_code=response.status_code,
+            headers=headers,
+            media_type=response.media_type,
+        )
+
+    async def __call__(self, request: Request, call_next) -> Response:
+        path = request.url.path
+        if path in EXEMPT_PATHS:
+            return await call_next(request)
+
+        m = self.metrics
+        m.in_flight += 1
+        m.max_in_flight = max(m.max_in_flight, m.in_flight)
+        m.recent.append(time.monotonic())
+        try:
+            response = await self._handle(request, call_next)
+        finally:
+            m.in_flight -= 1
+        m.requests[(path, response.status_code)] += 1
+        m.bytes_sent += int(response.headers.get("content-length", 0) or 0)
+        return response
@@ -8,8 +8,11 @@ from typing import Any
 
 from dateutil.parser import isoparse
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 
+from .faults import FaultConfig, FaultInjector
+
 
 def utc_now() -> datetime:
     return datetime.now(UTC)
@@ -86,10 +89,19 @@ MOCK_SEED = os.getenv("MOCK_SAAS_SEED", "dp_mailblaze_demo_seed_v1")
 # Deterministic base time anchored so runs are stable across days.
 ANCHOR = datetime(2026, 2, 1, 0, 0, 0, tzinfo=UTC)
 
+# Latency / 429 / 5xx / timeout / bandwidth injection; everything is off unless configured
+FAULTS = FaultInjector(MOCK_SEED, FaultConfig.load())
+app.middleware("http")(FAULTS)
+
 
 @app.get("/health")
 def health() -> dict[str, Any]:
-    return {"ok": True, "seed": MOCK_SEED}
+    return {"ok": True, "seed": MOCK_SEED, "faults": FAULTS.cfg.as_dict()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    return FAULTS.metrics.render(FAULTS.cfg)
 
 
 def generate_campaigns(n: int = 250) -> list[Campaign]:
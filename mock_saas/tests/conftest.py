@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+import os
+import sys
+
+# The service is imported as `app`, as uvicorn does from mock_saas/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
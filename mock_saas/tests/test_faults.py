@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import random
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.faults import FaultConfig, FaultInjector, Latency, TokenBucket
+
+
+def client(cfg: FaultConfig, seed: str = "seed") -> tuple[TestClient, FaultInjector]:
+    api = FastAPI()
+    faults = FaultInjector(seed, cfg)
+    api.middleware("http")(faults)
+
+    @api.get("/items")
+    def items(page: int = 0) -> dict:
+        return {"page": page, "data": "x" * 2048}
+
+    @api.get("/health")
+    def health() -> dict:
+        return {"ok": True}
+
+    return TestClient(api), faults
+
+
+def statuses(c: TestClient, n: int = 40) -> list[int]:
+    return [c.get("/items", params={"page": i}).status_code for i in range(n)]
+
+
+@pytest.mark.parametrize(
+    ("spec", "expected"),
+    [
+        ("none", Latency("none", 0, 0)),
+        ("fixed:50", Latency("fixed", 50, 0)),
+        ("lognormal:100,0.5", Latency("lognormal", 100, 0.5)),
+    ],
+)
+def test_latency_parse(spec, expected):
+    assert Latency.parse(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["fixed", "uniform:1", "gamma:1,2"])
+def test_latency_parse_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        Latency.parse(spec)
+
+
+def test_latency_samples_are_non_negative():
+    rng = random.Random(1)
+    assert all(Latency("normal", 5, 50).sample_ms(rng) >= 0 for _ in range(100))
+
+
+def test_config_load_reads_env(monkeypatch):
+    monkeypatch.setenv("MOCK_SAAS_LATENCY", "uniform:1,2")
+    monkeypatch.setenv("MOCK_SAAS_RATE_LIMIT_RPS", "5")
+    monkeypatch.setenv("MOCK_SAAS_ERROR_RATE", "0.1")
+    cfg = FaultConfig.load()
+    assert cfg.latency == Latency("uniform", 1, 2)
+    assert cfg.rate_limit_burst == 5
+    assert cfg.error_rate == 0.1
+
+
+def test_no_faults_passes_requests_through():
+    c, faults = client(FaultConfig())
+    assert set(statuses(c)) == {200}
+    assert faults.metrics.requests[("/items", 200)] == 40
+
+
+def test_errors_are_reproducible_per_seed_and_attempt():
+    cfg = FaultConfig(error_rate=0.3)
+    first, _ = client(cfg)
+    again, _ = client(cfg)
+    other, _ = client(cfg, seed="other")
+
+    run = statuses(first)
+    assert run == statuses(again)
+    assert run != statuses(other)
+    assert set(run) <= {200, 500, 502, 503}
+    assert 0 < sum(s != 200 for s in run) < 40
+
+    # Retrying a failed page draws again, from the same reproducible sequence
+    page = run.index(next(s for s in run if s != 200))
+    retries = [first.get("/items", params={"page": page}).status_code for _ in range(10)]
+    assert retries == [again.get("/items", params={"page": page}).status_code for _ in range(10)]
+    assert 200 in retries
+
+
+def test_rate_limit_returns_429_with_retry_after():
+    c, faults = client(FaultConfig(rate_limit_rps=1, rate_limit_burst=2))
+    responses = [c.get("/items") for _ in range(4)]
+
+    assert [r.status_code for r in responses] == [200, 200, 429, 429]
+    assert int(responses[2].headers["Retry-After"]) >= 1
+    assert faults.metrics.injected["rate_limited"] == 2
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=100, burst=1)
+    assert bucket.take() == 0
+    assert bucket.take() > 0
+    time.sleep(0.02)
+    assert bucket.take() == 0
+
+
+def test_timeouts_return_504_after_the_configured_delay():
+    c, faults = client(FaultConfig(timeout_rate=1.0, timeout_seconds=0.05))
+    t0 = time.perf_counter()
+    assert c.get("/items").status_code == 504
+    assert time.perf_counter() - t0 >= 0.05
+    assert faults.metrics.injected["timeout"] == 1
+
+
+def test_bandwidth_throttle_keeps_the_body_intact():
+    c, faults = client(FaultConfig(bandwidth_kbps=64))
+    r = c.get("/items", params={"page": 3})
+    assert r.status_code == 200
+    assert r.json() == {"page": 3, "data": "x" * 2048}
+    assert faults.metrics.bytes_sent >= 2048
+
+
+def test_exempt_paths_skip_faults_and_metrics():
+    c, faults = client(FaultConfig(error_rate=1.0, rate_limit_rps=0.001, rate_limit_burst=1))
+    assert [c.get("/health").status_code for _ in range(5)] == [200] * 5
+    assert not faults.metrics.requests
+
+
+def test_metrics_render_prometheus_text():
+    c, faults = client(FaultConfig(error_rate=1.0))
+    c.get("/items")
+    text = faults.metrics.render(faults.cfg)
+    assert 'mock_saas_injected_faults_total{kind="server_error"} 1' in text
+    assert 'mock_saas_fault_config{error_rate="1.0"} 1' in text
+    assert "mock_saas_max_in_flight_requests 1" in text
@@ -1,80 +1,460 @@
 import os
-import subprocess
-from datetime import timedelta
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
 
 import snowflake.connector
 from dotenv import load_dotenv
 from prefect import flow, get_run_logger, task
+from prefect.task_runners import ConcurrentTaskRunner
 from prefect.tasks import task_input_hash
 
 load_dotenv()
 
+# The ingest package (catalog, state, S3 helpers) is mounted next to the flow
+INGEST_DIR = os.getenv("INGEST_DIR", "/app/ingest")
+if INGEST_DIR not in sys.path:
+    sys.path.insert(0, INGEST_DIR)
+
+from src import (  # noqa: E402
+    extract_postgres,
+    extract_saas_mailblaze,
+    ingest_events_from_file,
+    ingest_inventory_csv,
+)
+from src.common.catalog import ManifestCatalog  # noqa: E402
+from src.common.config import AppConfig  # noqa: E402
+from src.common.s3 import S3Client  # noqa: E402
+from src.common.state import StateStore, max_merge  # noqa: E402
+
+DBT_PROJECT_DIR = os.getenv("DBT_PROJECT_DIR", "/app/dbt")
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", "/data/catalog/manifests.sqlite")
+FLOW_STATE_NAME = "prefect_flow"
+# How far before the durable watermark a rebuilt catalog still treats manifests as new:
+# covers PUTs that were in flight (earlier LastModified, listed later) at commit time
+MANIFEST_SAFETY_WINDOW = timedelta(hours=int(os.getenv("MANIFEST_SAFETY_WINDOW_HOURS", "1")))
+
+# Ingest manifest source -> dbt selector for everything downstream of its RAW table.
+# Sources without a RAW table yet (postgres, saas_mailblaze) select nothing.
+SOURCE_SELECTORS = {
+    "events": "source:raw.email_events_raw+",
+    "3pl_inventory": "source:raw.inventory_raw+",
+}
+
+
+REQUIRED_RAW_TABLES = ("EMAIL_EVENTS_RAW", "INVENTORY_RAW")
+
+# External stage over the raw bucket root, so stage-relative paths are the S3 keys
+RAW_STAGE = os.getenv("SNOWFLAKE_RAW_STAGE", "RAW.STG_S3_RAW")
+# Snowflake accepts at most 1000 names in COPY INTO ... FILES = (...)
+COPY_MAX_FILES = 1000
+
+# Ingest manifest source -> COPY INTO its RAW table; {stage} and {files} are filled per batch.
+# Inventory columns follow tools/generate_inventory_csv.py:
+# snapshot_date, warehouse_id, sku, on_hand_qty, ...
+RAW_COPY = {
+    "events": """
+        COPY INTO RAW.EMAIL_EVENTS_RAW (ingested_at, source_file, payload)
+        FROM (SELECT CURRENT_TIMESTAMP(), METADATA$FILENAME, $1 FROM @{stage})
+        FILES = ({files})
+        FILE_FORMAT = (FORMAT_NAME = RAW.FF_JSON)
+        ON_ERROR = 'CONTINUE'
+    """,
+    "3pl_inventory": """
+        COPY INTO RAW.INVENTORY_RAW
+            (ingested_at, source_file, sku, warehouse_id, on_hand, as_of_date)
+        FROM (
+            SELECT CURRENT_TIMESTAMP(), METADATA$FILENAME,
+                   $3::STRING, $2::STRING, $4::NUMBER, $1::DATE
+            FROM @{stage}
+        )
+        FILES = ({files})
+        FILE_FORMAT = (FORMAT_NAME = RAW.FF_CSV)
+        ON_ERROR = 'SKIP_FILE'
+    """,
+}
+
+_SF_CONN = None
+_SF_LOCK = threading.Lock()
+
+
+def sf_connection():
+    """
+    Flow-wide Snowflake connection: opened on first use and shared by every task
+    in the flow process (the connector is thread-safe), reopened if it dropped.
+    """
+    global _SF_CONN
+    with _SF_LOCK:
+        if _SF_CONN is None or _SF_CONN.is_closed():
+            _SF_CONN = snowflake.connector.connect(
+                account=os.environ["SNOWFLAKE_ACCOUNT"],
+                user=os.environ["SNOWFLAKE_USER"],
+                password=os.environ["SNOWFLAKE_PASSWORD"],
+                role=os.environ["SNOWFLAKE_ROLE"],
+                warehouse=os.environ["SNOWFLAKE_WAREHOUSE"],
+                database=os.environ["SNOWFLAKE_DATABASE"],
+                client_session_keep_alive=True,
+            )
+        return _SF_CONN
 
-def _sf_connect():
-    return snowflake.connector.connect(
-        account=os.environ["SNOWFLAKE_ACCOUNT"],
-        user=os.environ["SNOWFLAKE_USER"],
-        password=os.environ["SNOWFLAKE_PASSWORD"],
-        role=os.environ["SNOWFLAKE_ROLE"],
-        warehouse=os.environ["SNOWFLAKE_WAREHOUSE"],
-        database=os.environ["SNOWFLAKE_DATABASE"],
-    )
+
+def close_sf_connection() -> None:
+    global _SF_CONN
+    with _SF_LOCK:
+        if _SF_CONN is not None and not _SF_CONN.is_closed():
+            _SF_CONN.close()
+        _SF_CONN = None
 
 
 @task(
     retries=2,
     retry_delay_seconds=15,
     cache_key_fn=task_input_hash,
-    cache_expiration=timedelta(minutes=5),
+    cache_expiration=timedelta(hours=6),
+    persist_result=True,
 )
-def snowflake_preflight():
+def snowflake_preflight(account: str, role: str, warehouse: str, database: str):
     """
     Verify we can connect, and that role/warehouse are correct.
     Also validates RAW tables exist (EMAIL_EVENTS_RAW, INVENTORY_RAW).
+
+    One round trip checks the session context and every required RAW table;
+    the result is cached per account/role/warehouse/database.
     """
     logger = get_run_logger()
-    con = _sf_connect()
+    cur = sf_connection().cursor()
     try:
-        cur = con.cursor()
+        wanted = ", ".join(f"'{t}'" for t in REQUIRED_RAW_TABLES)
         cur.execute(
-            "SELECT CURRENT_USER(), CURRENT_ROLE(), CURRENT_WAREHOUSE(), CURRENT_DATABASE();"
+            f"""
+            SELECT CURRENT_USER(), CURRENT_ROLE(), CURRENT_WAREHOUSE(), CURRENT_DATABASE(),
+                   (SELECT LISTAGG(TABLE_NAME, ',')
+                    FROM {database}.INFORMATION_SCHEMA.TABLES
+                    WHERE TABLE_SCHEMA = 'RAW' AND TABLE_NAME IN ({wanted}))
+            """
         )
         row = cur.fetchone()
-        logger.info(f"Snowflake context: user={row[0]} role={row[1]} wh={row[2]} db={row[3]}")
+    finally:
+        cur.close()
+
+    logger.info(f"Snowflake context: user={row[0]} role={row[1]} wh={row[2]} db={row[3]}")
+    if (row[1] or "").upper() != role.upper() or (row[2] or "").upper() != warehouse.upper():
+        raise RuntimeError(f"Unexpected Snowflake context: role={row[1]} wh={row[2]}")
+
+    found = set((row[4] or "").split(","))
+    missing = [t for t in REQUIRED_RAW_TABLES if t not in found]
+    if missing:
+        raise RuntimeError(f"Missing RAW table(s) in {database}.RAW: {', '.join(missing)}")
 
-        # Ensure schemas exist
-        cur.execute("SHOW SCHEMAS LIKE 'RAW' IN DATABASE DP_MAILBLAZE_DEMO_DEV_DB;")
-        logger.info(f"RAW schema rows: {cur.rowcount}")
+    logger.info("Snowflake preflight OK.")
 
-        # Ensure the RAW tables exist
-        cur.execute("SHOW TABLES LIKE 'EMAIL_EVENTS_RAW' IN SCHEMA DP_MAILBLAZE_DEMO_DEV_DB.RAW;")
-        if cur.rowcount == 0:
-            raise RuntimeError("Missing RAW table: DP_MAILBLAZE_DEMO_DEV_DB.RAW.EMAIL_EVENTS_RAW")
 
-        cur.execute("SHOW TABLES LIKE 'INVENTORY_RAW' IN SCHEMA DP_MAILBLAZE_DEMO_DEV_DB.RAW;")
-        if cur.rowcount == 0:
-            raise RuntimeError("Missing RAW table: DP_MAILBLAZE_DEMO_DEV_DB.RAW.INVENTORY_RAW")
+def copy_statement(source: str, files: list[str]) -> str:
+    names = ", ".join("'" + f.replace("'", "''") + "'" for f in files)
+    return RAW_COPY[source].format(stage=RAW_STAGE, files=names)
 
-        logger.info("Snowflake preflight OK.")
+
+@task(retries=1, retry_delay_seconds=30)
+def load_raw(source: str, files: list[str]) -> list[dict]:
+    """
+    COPY exactly the given data files into the source's RAW table, in batches of
+    COPY_MAX_FILES, so Snowflake never lists or checks the rest of the stage.
+
+    Returns one row per file. Files Snowflake's load metadata already has are not
+    re-loaded and come back as ALREADY_LOADED; any LOAD_FAILED file fails the task
+    after the whole list has been attempted.
+    """
+    from prefect.artifacts import create_table_artifact
+
+    logger = get_run_logger()
+    started = time.perf_counter()
+    by_key: dict[str, dict] = {}
+
+    cur = sf_connection().cursor()
+    try:
+        for i in range(0, len(files), COPY_MAX_FILES):
+            cur.execute(copy_statement(source, files[i : i + COPY_MAX_FILES]))
+            cols = [d[0].lower() for d in cur.description]
+            # With nothing to load the result is a single "status" message row
+            if "file" not in cols:
+                continue
+            for row in cur.fetchall():
+                rec = dict(zip(cols, row, strict=True))
+                # Result names are stage URLs (s3://bucket/key); report by key
+                key = rec["file"].split("://", 1)[-1].split("/", 1)[-1]
+                by_key[key] = rec
     finally:
-        con.close()
+        cur.close()
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for key in files:
+        rec = by_key.get(key, {})
+        results.append(
+            {
+                "file": key,
+                "status": rec.get("status", "ALREADY_LOADED"),
+                "rows_loaded": rec.get("rows_loaded", 0),
+                "errors_seen": rec.get("errors_seen", 0),
+                "first_error": rec.get("first_error"),
+            }
+        )
+
+    for r in results:
+        if r["status"] not in ("LOADED", "ALREADY_LOADED"):
+            logger.warning(
+                f"{source}: {r['file']} {r['status']} "
+                f"errors={r['errors_seen']} first_error={r['first_error']}"
+            )
+
+    create_table_artifact(
+        key=f"raw-load-{source.replace('_', '-')}",
+        table=results,
+        description=f"COPY INTO for {source}: {len(files)} file(s) in {elapsed:.1f}s",
+    )
+    loaded = sum(r["rows_loaded"] or 0 for r in results)
+    logger.info(f"{source}: loaded {loaded} row(s) from {len(files)} file(s) in {elapsed:.1f}s")
+
+    failed = [r["file"] for r in results if r["status"] == "LOAD_FAILED"]
+    if failed:
+        raise RuntimeError(f"{source}: {len(failed)} file(s) failed to load: {failed[:5]}")
+    return results
+
+
+def _run_ingest(name: str, run_fn, *args) -> list[str]:
+    logger = get_run_logger()
+    started = time.perf_counter()
+    cfg = AppConfig.load()
+    manifests = run_fn(cfg, S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region), *args)
+    elapsed = time.perf_counter() - started
+    logger.info(f"{name}: wrote {len(manifests)} manifest(s) in {elapsed:.1f}s")
+    return manifests
+
+
+@task(retries=1, retry_delay_seconds=30)
+def ingest_postgres() -> list[str]:
+    return _run_ingest("ingest_postgres", extract_postgres.run)
+
+
+@task(retries=1, retry_delay_seconds=30)
+def ingest_saas() -> list[str]:
+    return _run_ingest("ingest_saas", extract_saas_mailblaze.run)
+
+
+# No task cache over the landing directory: the ingestors skip files they already
+# landed (per file, keyed on name/size/mtime for events and on the snapshot name
+# for inventory), so a rerun only uploads new files
+@task(retries=1, retry_delay_seconds=30)
+def ingest_events(input_glob: str) -> list[str]:
+    return _run_ingest("ingest_events", ingest_events_from_file.run, input_glob)
+
+
+@task(retries=1, retry_delay_seconds=30)
+def ingest_inventory(input_dir: str) -> list[str]:
+    return _run_ingest("ingest_inventory", ingest_inventory_csv.run, input_dir)
+
+
+_DBT_MANIFESTS: dict[str, object] = {}
+_DBT_MANIFEST_LOCK = threading.Lock()
+
+
+def _dbt_manifest(project_dir: str):
+    """
+    Parse the dbt project once per process and reuse the manifest for every
+    later invocation, so build/test do not re-parse and re-compile the project.
+    """
+    from dbt.cli.main import dbtRunner
+
+    with _DBT_MANIFEST_LOCK:
+        if project_dir not in _DBT_MANIFESTS:
+            res = dbtRunner().invoke(["parse", "--project-dir", project_dir, "--quiet"])
+            if not res.success:
+                raise RuntimeError(f"dbt parse failed: {res.exception}")
+            _DBT_MANIFESTS[project_dir] = res.result
+        return _DBT_MANIFESTS[project_dir]
+
+
+def _dbt_node_timings(result) -> list[dict]:
+    # Same per-node records dbt writes to target/run_results.json
+    rows = []
+    for r in getattr(result, "results", None) or []:
+        rows.append(
+            {
+                "node": r.node.unique_id,
+                "status": str(r.status),
+                "seconds": round(r.execution_time or 0.0, 3),
+            }
+        )
+    return sorted(rows, key=lambda row: row["seconds"], reverse=True)
 
 
 @task(retries=2, retry_delay_seconds=15)
-def run_dbt(cmd: str):
+def dbt_invoke(args: list[str]) -> list[dict]:
     """
-    Runs dbt inside the repo. Assumes dbt project lives in ./dbt
-    and profiles.yml exists in ~/.dbt/profiles.yml (mounted in container implicitly).
+    Runs dbt in-process through dbtRunner against DBT_PROJECT_DIR (profiles from
+    ~/.dbt/profiles.yml). Log lines are streamed to the task logger as dbt emits
+    them; per-node timings are returned and published as a table artifact.
     """
+    from dbt.cli.main import dbtRunner
+    from prefect.artifacts import create_table_artifact
+
     logger = get_run_logger()
-    full_cmd = ["bash", "-lc", cmd]
-    logger.info(f"Running: {cmd}")
-    proc = subprocess.run(full_cmd, capture_output=True, text=True)
-    logger.info(proc.stdout)
-    if proc.returncode != 0:
-        logger.error(proc.stderr)
-        raise RuntimeError(f"dbt command failed: {cmd}")
-    return proc.stdout
+
+    def _stream(event) -> None:
+        if event.info.level in ("info", "warn", "error") and event.info.msg:
+            logger.info(event.info.msg)
+
+    command = args[0]
+    if command == "deps":
+        # Installing packages changes what the project parses to
+        with _DBT_MANIFEST_LOCK:
+            _DBT_MANIFESTS.pop(DBT_PROJECT_DIR, None)
+        runner = dbtRunner(callbacks=[_stream])
+    else:
+        runner = dbtRunner(manifest=_dbt_manifest(DBT_PROJECT_DIR), callbacks=[_stream])
+
+    logger.info(f"Running: dbt {' '.join(args)}")
+    started = time.perf_counter()
+    res = runner.invoke([*args, "--project-dir", DBT_PROJECT_DIR])
+    elapsed = time.perf_counter() - started
+
+    timings = _dbt_node_timings(res.result)
+    if timings:
+        create_table_artifact(
+            key=f"dbt-{command}-node-timings",
+            table=timings,
+            description=f"dbt {command}: {len(timings)} nodes in {elapsed:.1f}s",
+        )
+        for row in timings[:5]:
+            logger.info(f"dbt slowest: {row['node']} {row['seconds']}s ({row['status']})")
+
+    if res.exception is not None:
+        raise RuntimeError(f"dbt {command} errored: {res.exception}") from res.exception
+    if not res.success:
+        raise RuntimeError(f"dbt command failed: dbt {' '.join(args)}")
+    logger.info(f"dbt {command} finished in {elapsed:.1f}s")
+    return timings
+
+
+@task
+def new_manifests() -> dict:
+    """
+    Sync the manifest catalog and return the manifests this flow has not processed yet.
+    They are marked processed by commit_manifests once the run succeeds.
+    """
+    logger = get_run_logger()
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+    state = StateStore(s3=s3, env=cfg.env, cache_dir=cfg.state_cache_dir or None)
+
+    catalog = ManifestCatalog(CATALOG_DB_PATH)
+    try:
+        # Incremental, plus a full listing every CATALOG_FULL_SYNC_HOURS for backfills
+        catalog.sync(s3, cfg.env)
+        if not catalog.has_processed(FLOW_STATE_NAME):
+            # New or rebuilt catalog: everything well before the durable watermark is done
+            floor = (state.get(FLOW_STATE_NAME) or {}).get("manifests_last_modified")
+            if floor:
+                seeded = catalog.mark_processed_before(
+                    FLOW_STATE_NAME, _minus(floor, MANIFEST_SAFETY_WINDOW)
+                )
+                logger.info(f"Seeded {seeded} processed manifests from watermark {floor}")
+        manifests = catalog.unprocessed(FLOW_STATE_NAME)
+        files: dict[str, list[str]] = {}
+        for f in catalog.files_for_manifests([m["manifest_key"] for m in manifests]):
+            files.setdefault(f["source"], []).append(f["data_key"])
+    finally:
+        catalog.close()
+
+    sources = sorted({m["source"] for m in manifests if m["source"]})
+    logger.info(f"Unprocessed manifests: {len(manifests)} (sources={sources})")
+    return {"manifests": manifests, "sources": sources, "files": files}
+
+
+def _minus(ts: str, delta: timedelta) -> str:
+    fmt = "%Y-%m-%dT%H:%M:%SZ"
+    return (datetime.strptime(ts, fmt) - delta).strftime(fmt)
+
+
+def dbt_selectors(sources: list[str]) -> list[str]:
+    selectors = [SOURCE_SELECTORS[s] for s in sources if s in SOURCE_SELECTORS]
+    # Model/macro changes since the last successful build need rebuilding too; only
+    # select them when there are some, so an unchanged project can still skip dbt
+    state_dir = dbt_state_dir()
+    if state_dir and _dbt_state_modified(state_dir):
+        selectors.append("state:modified+")
+    return selectors
+
+
+def dbt_state_dir() -> str | None:
+    """
+    $DBT_STATE_DIR when it holds a manifest to compare against. promote_dbt_state
+    refreshes (or seeds) it after every successful build.
+    """
+    state_dir = os.getenv("DBT_STATE_DIR", "").strip()
+    if state_dir and os.path.exists(os.path.join(state_dir, "manifest.json")):
+        return state_dir
+    return None
+
+
+def _dbt_state_modified(state_dir: str) -> bool:
+    from dbt.cli.main import dbtRunner
+
+    res = dbtRunner(manifest=_dbt_manifest(DBT_PROJECT_DIR)).invoke(
+        [
+            "ls",
+            "--select",
+            "state:modified",
+            "--state",
+            state_dir,
+            "--project-dir",
+            DBT_PROJECT_DIR,
+            "--quiet",
+        ]
+    )
+    if not res.success:
+        raise RuntimeError(f"dbt ls --select state:modified failed: {res.exception}")
+    return bool(res.result)
+
+
+def promote_dbt_state() -> None:
+    """
+    Write the manifest this run built from into $DBT_STATE_DIR, so the next run's
+    state:modified only selects changes made since.
+    """
+    state_dir = os.getenv("DBT_STATE_DIR", "").strip()
+    if not state_dir:
+        return
+    os.makedirs(state_dir, exist_ok=True)
+    tmp = os.path.join(state_dir, "manifest.json.tmp")
+    _dbt_manifest(DBT_PROJECT_DIR).write(tmp)
+    os.replace(tmp, os.path.join(state_dir, "manifest.json"))
+    get_run_logger().info(f"dbt state promoted to {state_dir}")
+
+
+@task
+def commit_manifests(manifests: list[dict]):
+    """
+    Mark the run's manifests processed in the catalog, and advance the durable
+    last_modified watermark that seeds a rebuilt catalog (see new_manifests).
+    """
+    logger = get_run_logger()
+    if not manifests:
+        return
+    cfg = AppConfig.load()
+    s3 = S3Client(bucket=cfg.s3_raw_bucket, region=cfg.aws_region)
+    state = StateStore(s3=s3, env=cfg.env, cache_dir=cfg.state_cache_dir or None)
+
+    catalog = ManifestCatalog(CATALOG_DB_PATH)
+    try:
+        catalog.mark_processed(FLOW_STATE_NAME, manifests)
+    finally:
+        catalog.close()
+
+    latest = max(m["last_modified"] for m in manifests)
+    state.update(FLOW_STATE_NAME, lambda cur: max_merge(cur, {"manifests_last_modified": latest}))
+    logger.info(f"Committed {len(manifests)} processed manifests (latest {latest})")
 
 
 @task
@@ -90,31 +470,88 @@ def notify_failure(message: str):
     logger.error(f"[MOCK NOTIFY] {message}")
 
 
-@flow(name="dp-mailblaze-demo-dev-flow")
-def mailblaze_flow():
+@flow(name="dp-mailblaze-demo-dev-flow", task_runner=ConcurrentTaskRunner())
+def mailblaze_flow(
+    run_ingest: bool = True,
+    events_input_glob: str = os.getenv("EVENTS_INPUT_GLOB", "/data/events/*.jsonl"),
+    inventory_input_dir: str = os.getenv("INVENTORY_INPUT_DIR", "/data/inventory"),
+):
     logger = get_run_logger()
 
+    # Exactly one process ingests the landing directories. Both skip files already
+    # ingested, but two processes validating the same new file at once would both
+    # upload it. With LANDING_INGESTER=watch the flow only picks up the watcher's
+    # manifests through new_manifests.
+    landing_ingester = os.getenv("LANDING_INGESTER", "flow")
+    if landing_ingester not in ("flow", "watch"):
+        raise ValueError(f"LANDING_INGESTER must be 'flow' or 'watch', got {landing_ingester!r}")
+
+    preflight = None
     try:
-        snowflake_preflight()
+        # Sources feeding dbt gate the build; postgres/SaaS have no dbt models yet and
+        # run alongside, off the critical path.
+        dbt_inputs = []
+        side_inputs = []
+        if run_ingest:
+            if landing_ingester == "flow":
+                dbt_inputs = [
+                    ingest_events.submit(events_input_glob),
+                    ingest_inventory.submit(inventory_input_dir),
+                ]
+            side_inputs = [ingest_postgres.submit(), ingest_saas.submit()]
+        preflight = snowflake_preflight.submit(
+            account=os.environ["SNOWFLAKE_ACCOUNT"],
+            role=os.environ["SNOWFLAKE_ROLE"],
+            warehouse=os.environ["SNOWFLAKE_WAREHOUSE"],
+            database=os.environ["SNOWFLAKE_DATABASE"],
+        )
+
+        changes = new_manifests.submit(wait_for=dbt_inputs).result()
+        # dbt deps only when packages are missing (a fresh checkout / image); ahead of
+        # dbt_selectors, whose state:modified check already parses the project
+        if not os.path.isdir(os.path.join(DBT_PROJECT_DIR, "dbt_packages")):
+            dbt_invoke(["deps"])
+        selectors = dbt_selectors(changes["sources"])
 
-        # dbt deps (safe to run repeatedly)
-        run_dbt("cd /app/dbt && dbt deps")
+        if not selectors:
+            logger.info("No new data for any dbt source and no modified models; skipping dbt.")
+            commit_manifests(changes["manifests"])
+            for fut in side_inputs:
+                fut.result()
+            return
 
-        # dbt snapshot (if you have snapshots configured)
-        # If you removed snapshots, comment this line out.
-        run_dbt("cd /app/dbt && dbt snapshot")
+        preflight.result()
 
-        # dbt run (build models)
-        run_dbt("cd /app/dbt && dbt run")
+        # Load exactly the new files, one concurrent COPY task per source
+        loads = [
+            load_raw.submit(source, keys)
+            for source, keys in changes["files"].items()
+            if source in RAW_COPY
+        ]
+        for fut in loads:
+            fut.result()
 
-        # dbt test
-        run_dbt("cd /app/dbt && dbt test")
+        # One in-process build (snapshot + run + test) of what is downstream of new data
+        build_args = ["build", "--select", *selectors]
+        if "state:modified+" in selectors:
+            build_args += ["--state", dbt_state_dir()]
+        dbt_invoke(build_args)
+        promote_dbt_state()
 
+        commit_manifests(changes["manifests"])
+        for fut in side_inputs:
+            fut.result()
         logger.info("Flow completed successfully.")
 
     except Exception as e:
         notify_failure(f"Flow failed: {e}")
         raise
+    finally:
+        # Preflight runs alongside ingestion and is not awaited on the skip path; let it
+        # finish before closing the shared connection it may still be using (or reopen)
+        if preflight is not None:
+            preflight.wait()
+        close_sf_connection()
 
 
 if __name__ == "__main__":
@@ -5,6 +5,8 @@ import hashlib
 import json
 import os
 import random
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
@@ -110,6 +112,190 @@ def write_jsonl(events: list[dict], out_path: Path) -> None:
             f.write(json.dumps(e, separators=(",", ":"), ensure_ascii=False) + "\n")
 
 
+USER_AGENTS = ["Mozilla/5.0", "Chrome/122.0", "Safari/17.2"]
+
+# Event types that carry a sku, and the subset that also sets url
+_SKU_EVENT_TYPES = ("product_view", "add_to_cart", "purchase")
+_URL_EVENT_TYPES = ("page_view", "product_view")
+_CAMPAIGN_EVENT_TYPES = ("email_open", "email_click")
+
+
+def _json_str(v: str | None) -> str:
+    return "null" if v is None else json.dumps(v, ensure_ascii=False)
+
+
+def _json_int(v: int | None) -> str:
+    return "null" if v is None else str(v)
+
+
+def render_batch(
+    seed: str, root_seed: int, base_ts: datetime, block: int, start: int, stop: int
+) -> str:
+    """
+    Render events [start, stop) as JSONL using NumPy-batched draws.
+
+    The RNG is seeded from (root_seed, block), so a given block always yields the
+    same lines no matter which shard or worker process renders it.
+    """
+    import numpy as np
+
+    n = stop - start
+    rng = np.random.default_rng([root_seed, block])
+    idx = np.arange(start, stop, dtype=np.int64)
+
+    type_idx = rng.integers(0, len(EVENT_TYPES), n)
+    jitter = rng.integers(0, 3, n)
+    customer_ids = rng.integers(1, 5001, n)
+    session_ids = rng.integers(1, 200001, n)
+    platform_idx = rng.integers(0, len(PLATFORMS), n)
+    country_idx = rng.integers(0, len(COUNTRY_CODES), n)
+    sku_idx = rng.integers(0, len(SKUS), n)
+    cart_qty = rng.integers(1, 4, n)
+    campaign_nums = rng.integers(0, 250, n)
+    category_nums = rng.integers(1, 51, n)
+    received_delay = rng.integers(1, 31, n)
+    ua_idx = rng.integers(0, len(USER_AGENTS), n)
+    ip_octets = rng.integers(1, 255, n)
+
+    base = np.datetime64(base_ts.replace(tzinfo=None), "s")
+    event_secs = base + (3 * idx + jitter).astype("timedelta64[s]")
+    event_ts = np.datetime_as_string(event_secs, unit="s")
+    received_ts = np.datetime_as_string(
+        event_secs + received_delay.astype("timedelta64[s]"), unit="s"
+    )
+
+    revenue_by_sku = [1500 + (int(sha256_hex(sku)[:6], 16) % 9000) for sku in SKUS]
+    key_prefix = hashlib.sha256(f"{seed}::idempotency::".encode())
+
+    lines: list[str] = []
+    for j, (i, t, cust, sess, plat, ctry, sk, qty, cmp, cat, ua, ip) in enumerate(
+        zip(
+            idx.tolist(),
+            type_idx.tolist(),
+            customer_ids.tolist(),
+            session_ids.tolist(),
+            platform_idx.tolist(),
+            country_idx.tolist(),
+            sku_idx.tolist(),
+            cart_qty.tolist(),
+            campaign_nums.tolist(),
+            category_nums.tolist(),
+            ua_idx.tolist(),
+            ip_octets.tolist(),
+            strict=True,
+        )
+    ):
+        event_type = EVENT_TYPES[t]
+        event_id = f"ev_{i:010d}"
+        h = key_prefix.copy()
+        h.update(event_id.encode("utf-8"))
+
+        sku = SKUS[sk] if event_type in _SKU_EVENT_TYPES else None
+        quantity = None
+        if sku is not None:
+            quantity = qty if event_type == "add_to_cart" else 1
+        revenue_cents = revenue_by_sku[sk] if event_type == "purchase" else None
+        campaign_id = f"cmp_{cmp:04d}" if event_type in _CAMPAIGN_EVENT_TYPES else None
+        url = None
+        if event_type in _URL_EVENT_TYPES:
+            url = (
+                f"https://shop.example.com/p/{sku}"
+                if sku
+                else f"https://shop.example.com/c/{cat:02d}"
+            )
+
+        lines.append(
+            "{"
+            '"schema_version":1,'
+            f'"event_id":"{event_id}",'
+            f'"idempotency_key":"{h.hexdigest()}",'
+            f'"event_type":"{event_type}",'
+            f'"event_ts":"{event_ts[j]}Z",'
+            f'"received_ts":"{received_ts[j]}Z",'
+            f'"customer_id":{cust},'
+            f'"session_id":"sess_{sess:06d}",'
+            f'"platform":"{PLATFORMS[plat]}",'
+            f'"country_code":"{COUNTRY_CODES[ctry]}",'
+            f'"sku":{_json_str(sku)},'
+            f'"quantity":{_json_int(quantity)},'
+            f'"revenue_cents":{_json_int(revenue_cents)},'
+            f'"campaign_id":{_json_str(campaign_id)},'
+            f'"url":{_json_str(url)},'
+            f'"user_agent":"{USER_AGENTS[ua]}",'
+            f'"ip_address":"198.51.100.{ip}"'
+            "}\n"
+        )
+    return "".join(lines)
+
+
+def shard_path(out_path: Path, shard: int, shards: int) -> Path:
+    if shards == 1:
+        return out_path
+    return out_path.with_name(f"{out_path.stem}-{shard:05d}-of-{shards:05d}{out_path.suffix}")
+
+
+def write_shard(
+    seed: str,
+    root_seed: int,
+    base_ts: datetime,
+    count: int,
+    batch_size: int,
+    shard: int,
+    shards: int,
+    out_path: Path,
+) -> int:
+    """
+    Stream one shard to disk, one batch at a time.
+
+    Shards own contiguous runs of batches, so concatenating shard files in order
+    reproduces the unsharded output for the same --batch-size.
+    """
+    blocks = (count + batch_size - 1) // batch_size
+    first_block = blocks * shard // shards
+    last_block = blocks * (shard + 1) // shards
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with out_path.open("w", encoding="utf-8") as f:
+        for block in range(first_block, last_block):
+            start = block * batch_size
+            stop = min(start + batch_size, count)
+            f.write(render_batch(seed, root_seed, base_ts, block, start, stop))
+            written += stop - start
+    return written
+
+
+def generate_sharded(
+    seed: str,
+    root_seed: int,
+    base_ts: datetime,
+    count: int,
+    out_path: Path,
+    shards: int,
+    workers: int,
+    batch_size: int,
+    merge: bool,
+) -> tuple[int, list[Path]]:
+    paths = [shard_path(out_path, k, shards) for k in range(shards)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(write_shard, seed, root_seed, base_ts, count, batch_size, k, shards, fp)
+            for k, fp in enumerate(paths)
+        ]
+        total = sum(fut.result() for fut in futures)
+
+    if merge and shards > 1:
+        # Ordered merge: shard k holds strictly lower event indexes than shard k+1
+        with out_path.open("wb") as out:
+            for fp in paths:
+                with fp.open("rb") as src:
+                    shutil.copyfileobj(src, out, length=16 * 1024 * 1024)
+                fp.unlink()
+        paths = [out_path]
+
+    return total, paths
+
+
 def main() -> None:
     p = argparse.ArgumentParser(description="Generate deterministic event JSONL file")
     p.add_argument("--count", type=int, required=True, help="Number of events to generate")
@@ -120,6 +306,29 @@ def main() -> None:
         default="2026-02-18T09:00:00Z",
         help="Base timestamp (UTC) ISO8601 ending with Z (default: 2026-02-18T09:00:00Z)",
     )
+    p.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="Stream output with NumPy-batched draws into N shard files (0 = in-memory mode)",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes used to render shards (streaming mode only)",
+    )
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        default=100_000,
+        help="Events per RNG batch; output is deterministic for a given seed and batch size",
+    )
+    p.add_argument(
+        "--merge",
+        action="store_true",
+        help="Concatenate shard files, in order, into --out (streaming mode only)",
+    )
     args = p.parse_args()
 
     # Deterministic RNG seeded by seed+base-ts so re-running produces identical file
@@ -131,6 +340,28 @@ def main() -> None:
 
     base_ts = datetime.strptime(args.base_ts, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=UTC)
 
+    if args.shards > 0:
+        try:
+            import numpy  # noqa: F401
+        except ImportError as e:
+            raise SystemExit("--shards requires numpy (pip install numpy)") from e
+        if args.batch_size < 1:
+            raise SystemExit("--batch-size must be >= 1")
+
+        total, paths = generate_sharded(
+            seed=args.seed,
+            root_seed=int(sha256_hex(seed_material)[:12], 16),
+            base_ts=base_ts,
+            count=args.count,
+            out_path=Path(args.out),
+            shards=args.shards,
+            workers=max(1, min(args.workers, args.shards)),
+            batch_size=args.batch_size,
+            merge=args.merge,
+        )
+        print(f"Wrote {total} events to {len(paths)} file(s): {', '.join(str(fp) for fp in paths)}")
+        return
+
     events = [make_event(rng, args.seed, base_ts, i) for i in range(args.count)]
     write_jsonl(events, Path(args.out))
     print(f"Wrote {len(events)} events to {args.out}")
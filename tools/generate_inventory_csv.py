@@ -5,8 +5,9 @@ import csv
 import hashlib
 import os
 from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 
@@ -35,6 +36,20 @@ SKUS = [
     "SKU-LEATHER-BELT",
     "SKU-RUNNING-SHORTS",
 ]
+REGIONS = ["EU", "US", "APAC"]
+
+FIELDNAMES = [
+    "snapshot_date",
+    "warehouse_id",
+    "sku",
+    "on_hand_qty",
+    "reserved_qty",
+    "available_qty",
+    "reorder_point",
+    "supplier_lead_time_days",
+    "unit_cost_cents",
+    "updated_at_utc",
+]
 
 
 def stable_int(seed: str, key: str, mod: int) -> int:
@@ -80,21 +95,8 @@ def gen_rows(snapshot: date, seed: str) -> list[InventoryRow]:
 def write_csv(rows: Iterable[InventoryRow], out_path: Path) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    fieldnames = [
-        "snapshot_date",
-        "warehouse_id",
-        "sku",
-        "on_hand_qty",
-        "reserved_qty",
-        "available_qty",
-        "reorder_point",
-        "supplier_lead_time_days",
-        "unit_cost_cents",
-        "updated_at_utc",
-    ]
-
     with out_path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w = csv.DictWriter(f, fieldnames=FIELDNAMES)
         w.writeheader()
         for r in rows:
             w.writerow(
@@ -113,19 +115,181 @@ def write_csv(rows: Iterable[InventoryRow], out_path: Path) -> None:
             )
 
 
+def warehouse_ids(n: int) -> list[str]:
+    # Keep the original warehouses first so small runs match the fixed-list output
+    out = WAREHOUSES[:n]
+    for i in range(len(out), n):
+        out.append(f"WH_{REGIONS[i % len(REGIONS)]}_{i // len(REGIONS) + 10:02d}")
+    return out
+
+
+def sku_ids(n: int) -> list[str]:
+    # Keep the catalogue SKUs first so generated events still join to inventory
+    out = SKUS[:n]
+    for i in range(len(out), n):
+        out.append(f"SKU-{i:08d}")
+    return out
+
+
+def render_batch(
+    root_seed: int, snapshot: date, wh_index: int, wh: str, skus: list[str], batch: int
+) -> str:
+    """
+    Render one batch of CSV lines for a single warehouse.
+
+    The RNG is seeded from (root_seed, snapshot, warehouse, batch), so every
+    warehouse renders identically whether or not the output is sharded.
+    """
+    import numpy as np
+
+    n = len(skus)
+    rng = np.random.default_rng([root_seed, snapshot.toordinal(), wh_index, batch])
+
+    base = rng.integers(0, 500, n)
+    demand = rng.integers(0, 200, n)
+    on_hand = np.maximum(0, base + 50 - demand)
+    reserved = rng.integers(0, np.minimum(50, on_hand + 1))
+    available = np.maximum(0, on_hand - reserved)
+    reorder_point = 30 + rng.integers(0, 70, n)
+    lead_time = 3 + rng.integers(0, 18, n)
+    unit_cost = 500 + rng.integers(0, 8000, n)
+
+    snap = snapshot.isoformat()
+    prefix = f"{snap},{wh},"
+    suffix = f",{snap}T02:00:00Z\n"
+    return "".join(
+        f"{prefix}{sku},{oh},{rs},{av},{rop},{lt},{uc}{suffix}"
+        for sku, oh, rs, av, rop, lt, uc in zip(
+            skus,
+            on_hand.tolist(),
+            reserved.tolist(),
+            available.tolist(),
+            reorder_point.tolist(),
+            lead_time.tolist(),
+            unit_cost.tolist(),
+            strict=True,
+        )
+    )
+
+
+def write_snapshot(
+    root_seed: int,
+    snapshot: date,
+    warehouses: list[tuple[int, str]],
+    skus: list[str],
+    batch_size: int,
+    out_path: Path,
+) -> int:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        f.write(",".join(FIELDNAMES) + "\n")
+        for wh_index, wh in warehouses:
+            for batch, start in enumerate(range(0, len(skus), batch_size)):
+                chunk = skus[start : start + batch_size]
+                f.write(render_batch(root_seed, snapshot, wh_index, wh, chunk, batch))
+                written += len(chunk)
+    return written
+
+
+def generate_range(
+    seed: str,
+    start: date,
+    end: date,
+    out_dir: Path,
+    n_warehouses: int,
+    n_skus: int,
+    batch_size: int,
+    shard_by_warehouse: bool,
+    workers: int,
+) -> tuple[int, int]:
+    root_seed = int(hashlib.sha256(seed.encode("utf-8")).hexdigest()[:12], 16)
+    warehouses = list(enumerate(warehouse_ids(n_warehouses)))
+    skus = sku_ids(n_skus)
+
+    jobs: list[tuple[date, list[tuple[int, str]], Path]] = []
+    day = start
+    while day <= end:
+        snap = day.isoformat()
+        if shard_by_warehouse:
+            # inventory_snapshot_<warehouse>_<date>.csv; ingestion keys each shard separately
+            for wh_index, wh in warehouses:
+                fp = out_dir / f"inventory_snapshot_{wh}_{snap}.csv"
+                jobs.append((day, [(wh_index, wh)], fp))
+        else:
+            jobs.append((day, warehouses, out_dir / f"inventory_snapshot_{snap}.csv"))
+        day += timedelta(days=1)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(write_snapshot, root_seed, day, whs, skus, batch_size, fp)
+            for day, whs, fp in jobs
+        ]
+        total = sum(fut.result() for fut in futures)
+    return total, len(jobs)
+
+
 def main() -> None:
     p = argparse.ArgumentParser(description="Generate deterministic inventory snapshot CSV")
-    p.add_argument("--date", required=True, help="Snapshot date in YYYY-MM-DD")
-    p.add_argument("--out", required=True, help="Output CSV path")
+    p.add_argument("--date", help="Snapshot date in YYYY-MM-DD")
+    p.add_argument("--out", help="Output CSV path (single --date, fixed warehouse/SKU lists)")
     p.add_argument(
         "--seed", default=os.getenv("INVENTORY_SEED", "dp_mailblaze_demo_inventory_seed_v1")
     )
+    p.add_argument("--start-date", help="First snapshot date (YYYY-MM-DD) for range generation")
+    p.add_argument("--end-date", help="Last snapshot date (YYYY-MM-DD, inclusive)")
+    p.add_argument("--out-dir", help="Directory for inventory_snapshot_*.csv (range generation)")
+    p.add_argument("--warehouses", type=int, default=len(WAREHOUSES), help="Warehouse count")
+    p.add_argument("--skus", type=int, default=len(SKUS), help="SKU count per warehouse")
+    p.add_argument("--batch-size", type=int, default=250_000, help="Rows per RNG batch")
+    p.add_argument(
+        "--shard-by-warehouse",
+        action="store_true",
+        help="Write one file per warehouse and snapshot date",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes used to render snapshot files",
+    )
     args = p.parse_args()
 
-    snapshot = date.fromisoformat(args.date)
-    rows = gen_rows(snapshot, args.seed)
-    write_csv(rows, Path(args.out))
-    print(f"Wrote {len(rows)} rows to {args.out}")
+    if args.out_dir is None:
+        if not args.date or not args.out:
+            raise SystemExit("either --date and --out, or --out-dir with a date range, is required")
+        snapshot = date.fromisoformat(args.date)
+        rows = gen_rows(snapshot, args.seed)
+        write_csv(rows, Path(args.out))
+        print(f"Wrote {len(rows)} rows to {args.out}")
+        return
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError as e:
+        raise SystemExit("--out-dir requires numpy (pip install numpy)") from e
+
+    if not (args.start_date or args.date):
+        raise SystemExit("--out-dir requires --start-date (or --date)")
+    start = date.fromisoformat(args.start_date or args.date)
+    end = date.fromisoformat(args.end_date) if args.end_date else start
+    if end < start:
+        raise SystemExit("--end-date must not be before --start-date")
+    if args.warehouses < 1 or args.skus < 1 or args.batch_size < 1:
+        raise SystemExit("--warehouses, --skus and --batch-size must be >= 1")
+
+    total, files = generate_range(
+        seed=args.seed,
+        start=start,
+        end=end,
+        out_dir=Path(args.out_dir),
+        n_warehouses=args.warehouses,
+        n_skus=args.skus,
+        batch_size=args.batch_size,
+        shard_by_warehouse=args.shard_by_warehouse,
+        workers=max(1, args.workers),
+    )
+    print(f"Wrote {total} rows to {files} file(s) in {args.out_dir}")
 
 
 if __name__ == "__main__":